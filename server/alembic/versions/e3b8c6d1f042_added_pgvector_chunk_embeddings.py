@@ -0,0 +1,53 @@
+"""added pgvector chunk embeddings
+
+Revision ID: e3b8c6d1f042
+Revises: a41f5d8c2e97
+Create Date: 2026-10-17 15:22:09.418305
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import get_settings
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8c6d1f042'
+down_revision: Union[str, Sequence[str], None] = 'a41f5d8c2e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only used by the "pgvector" vector store backend - servers without the extension skip it
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    ).scalar()
+    if not available:
+        if get_settings().vector_store_backend == "pgvector":
+            # PgVectorStore would only fail later, at connect and query time
+            raise RuntimeError(
+                "vector_store_backend is 'pgvector' but the vector extension is not available on this server"
+            )
+        logger.warning("pgvector is not available on this server, skipping document_chunks.embedding")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    # Not mapped on DocumentChunk: written and searched with explicit SQL by the pgvector backend
+    op.execute("ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS embedding vector(768)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_document_chunks_embedding_hnsw ON document_chunks "
+        "USING hnsw (embedding vector_cosine_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_document_chunks_embedding_hnsw")
+    op.execute("ALTER TABLE document_chunks DROP COLUMN IF EXISTS embedding")
@@ -1,6 +1,6 @@
 # app/api/v1/document.py
 
-from fastapi import APIRouter, UploadFile, File, status
+from fastapi import APIRouter, UploadFile, File, Response, status
 from app.core.database import AsyncSessionDep
 from app.services.document_processor import DocumentProcessor
 from app.services.document_service import DocumentService
@@ -10,7 +10,8 @@ from app.schemas.document import (
     DocumentUploadResponse,
     DocumentStatusResponse,
     DocumentListItem,
-    DocumentDeleteResponse
+    DocumentDeleteResponse,
+    ChunkCacheStatsResponse
 )
 from app.schemas.insights import ContractAnalysisResponse
 import logging
@@ -46,6 +47,41 @@ async def upload_file(
     return document
 
 
+@document_router.post(
+    "/{document_id}/versions",
+    response_model=DocumentUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Upload a new version of a document"
+)
+async def upload_document_version(
+    document_id: str,
+    db: AsyncSessionDep,
+    user: CurrentUserDep,
+    doc_file: UploadFile = File(..., description="Revised PDF document"),
+):
+    """
+    Upload a revised PDF for an existing document.
+    Only sections that changed since the previous version are reprocessed.
+    """
+    return await document_processor.process_new_version(
+        document_id=document_id,
+        db=db,
+        user=user,
+        file=doc_file
+    )
+
+
+@document_router.get(
+    "/chunk-cache/stats",
+    response_model=ChunkCacheStatsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get chunk cache statistics"
+)
+async def get_chunk_cache_stats(user: CurrentUserDep):
+    """Hits, misses and evictions of the chunk summary cache shared by all ingestion workers."""
+    return await document_service.get_chunk_cache_stats()
+
+
 @document_router.get(
     "/{document_id}/status",
     response_model=DocumentStatusResponse,
@@ -54,20 +90,50 @@ async def upload_file(
 )
 async def get_document_status(
     document_id: str,
+    response: Response,
     db: AsyncSessionDep,
     user: CurrentUserDep
 ):
-    """Get the processing status of a document."""
-    document = await document_service.get_user_document(
+    """
+    Get the processing status of a document.
+    While it is processing, includes per-stage progress and an ETA;
+    clients should wait `poll_after_seconds` (also sent as Retry-After) before polling again.
+    """
+    document_status = await document_service.get_document_status(
+        user_id=user.id,
+        document_id=document_id,
+        db=db
+    )
+    if document_status.poll_after_seconds:
+        response.headers["Retry-After"] = str(document_status.poll_after_seconds)
+    
+    return document_status
+
+
+@document_router.get(
+    "/{document_id}/blobs/{blob_key}",
+    status_code=status.HTTP_200_OK,
+    summary="Get an image or table extracted from a document"
+)
+async def get_document_blob(
+    document_id: str,
+    blob_key: str,
+    user: CurrentUserDep,
+    db: AsyncSessionDep
+):
+    """Serve an image or large table referenced by a document chunk."""
+    data, content_type = await document_service.get_document_blob(
         user_id=user.id,
         document_id=document_id,
+        blob_key=blob_key,
         db=db
     )
     
-    return DocumentStatusResponse(
-        document_id=document.id,
-        processing_status=document.processing_status,
-        error_message=document.error_message
+    # Content-addressed - the bytes behind a key never change
+    return Response(
+        content=data,
+        media_type=content_type,
+        headers={"Cache-Control": "private, max-age=31536000, immutable"}
     )
 
 
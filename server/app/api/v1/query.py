@@ -4,7 +4,7 @@ from app.core.dependencies import CurrentUserDep
 from app.services.query_service import QueryService
 from app.schemas.query import QueryResponseDTO, QueryRequest
 from typing import List
-from app.services.pinecone_service import PineconeService
+from app.services.vector_store import VectorStore
 
 query_router = APIRouter(prefix="/api/v1/contracts", tags=["contract-queries"])
 
@@ -23,15 +23,15 @@ async def query_document(
     db: AsyncSessionDep,
     user: CurrentUserDep
 ) -> QueryResponseDTO:
-    # Get Pinecone from app state
-    pinecone_service : PineconeService = request.app.state.pinecone_service
+    # Get the vector store from app state
+    vector_store : VectorStore = request.app.state.vector_store
     
 
     query_response = await query_service.process_contract_query(
         query_text=payload.query_text,
         document_id=payload.document_id,
         user_id=user.id,
-        pinecone_service=pinecone_service,
+        vector_store=vector_store,
         db=db
     )
     
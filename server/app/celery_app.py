@@ -22,7 +22,20 @@ celery_app.conf.update(
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,  # One task at a time for heavy processing
+    task_default_queue=settings.ingestion_default_queue,
+    # Ingestion tasks are dispatched by IngestionScheduler, which picks the lane per document:
+    # run workers with `-Q documents_priority,documents` (or dedicate some to the priority lane)
     task_routes={
-        'app.tasks.document_tasks.*': {'queue': 'documents'},
+        'app.tasks.document_tasks.*': {'queue': settings.ingestion_default_queue},
+        # Short bookkeeping task - keep it out from behind large documents
+        'dispatch_ingestion': {'queue': settings.ingestion_priority_queue},
+    },
+    # Needs a beat process (`celery -A app.celery_app beat`, or a worker started with `-B`)
+    beat_schedule={
+        'dispatch-ingestion': {
+            'task': 'dispatch_ingestion',
+            'schedule': settings.ingestion_dispatch_interval,
+            'options': {'expires': settings.ingestion_dispatch_interval},
+        },
     },
 )
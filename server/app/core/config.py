@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -17,14 +19,84 @@ class Settings(BaseSettings):
     
     chunk_size:int 
     chunk_overlap:int
+    pdf_parse_window_pages: int = 10
+    pdf_parse_processes: Optional[int] = None  # Per worker process: None = one per CPU core, 1 = parse in a thread
+    pdf_download_chunk_bytes: int = 1024 * 1024
+    pdf_spool_dir: Optional[str] = None  # Shared volume where the API leaves uploads for workers
+    
+    ingestion_queue_size: int = 32
+    ingestion_flush_interval: float = 2.0
+    ingestion_default_queue: str = "documents"
+    ingestion_priority_queue: str = "documents_priority"
+    ingestion_priority_max_bytes: int = 2 * 1024 * 1024  # Documents up to this size use the priority lane
+    ingestion_user_concurrency: int = 2
+    ingestion_priority_user_concurrency: int = 2
+    ingestion_user_concurrency_overrides: Dict[str, int] = {}  # user_id -> cap, e.g. for bulk-import tenants
+    ingestion_slot_ttl: int = 2 * 60 * 60
+    ingestion_dispatch_interval: float = 30.0  # Periodic dispatch (celery beat) that recovers stalled queues
+    ingestion_distributed: bool = False  # Fan chunk batches out across workers as a Celery chord
+    ingestion_fanout_batch_size: int = 25
+    ingestion_max_inflight_batches: int = 4  # Per document - the next batches are queued as these finish
+    ingestion_checkpoint_ttl: int = 24 * 60 * 60
+    ingestion_retry_backoff_seconds: int = 30
+    ingestion_retry_backoff_max: int = 600
+    ingestion_progress_interval: float = 1.0
+    ingestion_progress_ttl: int = 24 * 60 * 60
+    chunk_insert_batch_size: int = 1000
+    chunk_copy_min_rows: int = 5000  # Batches at least this large are written with COPY
     
     gemini_api_key : str
     gemini_model : str = "gemini-2.5-flash-lite"
     gemini_embedding_model: str = "models/text-embedding-004"
+    gemini_max_concurrency: int = 8
+    gemini_requests_per_second: float = 2.0
+    gemini_tokens_per_minute: int = 1_000_000
+    gemini_embedding_batch_size: int = 100
+    gemini_query_requests_per_second: float = 1.0  # Separate budget for interactive queries
+    gemini_query_tokens_per_minute: int = 250_000
+    gemini_rate_limit_backend: str = "redis"  # "redis" (shared by all processes) or "local"
+    gemini_aimd_decrease_factor: float = 0.5
+    gemini_aimd_increase_step: float = 0.01
+    gemini_aimd_min_scale: float = 0.1
+    gemini_aimd_cooldown_seconds: float = 5.0
+    
+    chunk_cache_enabled: bool = True
+    chunk_cache_max_entries: int = 50_000
+    
+    vector_store_backend : str = "pinecone"  # "pinecone", "local" (in-process NumPy index on disk) or "pgvector" (document_chunks.embedding)
+    vector_store_local_dir : str = "./vector_store"
+    vector_store_user_namespaces : bool = True  # One namespace per user, vectors tagged with document_id
+    vector_store_legacy_fallback : bool = True  # Search the default namespace for documents not migrated yet
+
+    # Retrieval post-processing
+    retrieval_candidate_k : int = 20  # Matches fetched per query before filtering
+    retrieval_max_k : int = 5
+    retrieval_min_k : int = 1
+    retrieval_min_score : float = 0.3  # Cosine similarity floor
+    retrieval_score_gap : float = 0.08  # Score drop that ends the kept matches early
+    retrieval_mmr_lambda : float = 0.7  # Relevance vs. diversity trade-off, 1.0 disables MMR
+    retrieval_mode : str = "vector"  # "vector" or "hybrid" (vector + Postgres full-text, fused by RRF)
+    retrieval_lexical_k : int = 10  # Full-text matches fused with the vector matches in hybrid mode
+    retrieval_rrf_k : int = 60  # Reciprocal rank fusion constant
     
     pinecone_api_key : str
     pinecone_index_name : str
     pinecone_environment : str
+    pinecone_index_host : Optional[str] = None
+    pinecone_skip_control_plane : bool = False  # No control-plane calls at all - requires pinecone_index_host
+    pinecone_upsert_batch_size : int = 100
+    pinecone_upsert_max_bytes : int = 2 * 1024 * 1024
+    pinecone_upsert_concurrency : int = 4
+    pinecone_upsert_max_retries : int = 3
+    
+    blob_store_backend : str = "local"  # "local" or "s3"
+    blob_store_local_dir : str = "./blob_store"
+    blob_store_s3_bucket : Optional[str] = None
+    blob_store_s3_endpoint_url : Optional[str] = None
+    blob_store_s3_access_key : Optional[str] = None
+    blob_store_s3_secret_key : Optional[str] = None
+    blob_store_s3_region : Optional[str] = None
+    blob_inline_table_max_bytes : int = 4096
     
     redis_prefix_celery : str
     celery_broker_url : str
@@ -35,5 +107,7 @@ class Settings(BaseSettings):
         extra = 'ignore'
 
 
+@lru_cache
 def get_settings() -> Settings:
+    # Read from the environment once per process - hot paths call this per batch and per query
     return Settings()     
\ No newline at end of file
@@ -72,6 +72,15 @@ class DocumentProcessingError(DomainException):
             details=details
         )
 
+class DocumentBusyError(DomainException):
+    """Document is still being processed"""
+    def __init__(self, document_id: str):
+        super().__init__(
+            message="Document is still being processed, try again once it has finished",
+            error_code="DOCUMENT_BUSY",
+            details={"document_id": document_id}
+        )
+
 class FileUploadError(DomainException):
     """File upload failed""" 
     def __init__(self, message: str):
@@ -87,6 +96,10 @@ class ChunkNotFoundError(ResourceNotFoundError):
             f"embedding_ids: {embedding_ids}"
         )
 
+class BlobNotFoundError(ResourceNotFoundError):
+    def __init__(self, key: str):
+        super().__init__("Blob", key)
+
 class UserNotFoundError(ResourceNotFoundError):
     def __init__(self, user_id: str = None):
         identifier = user_id if user_id else "unknown"
@@ -142,6 +155,14 @@ class EmbeddingError(ExternalServiceError):
             error_code="EMBEDDING_ERROR"
         )
 
+class BlobStoreError(ExternalServiceError):
+    def __init__(self, operation: str, details: str = None):
+        super().__init__(
+            message=f"Blob store error during {operation}",
+            error_code="BLOB_STORE_ERROR",
+            details={"operation": operation, "details": details}
+        )
+
 class CloudinaryError(ExternalServiceError):
     def __init__(self, operation: str, details: str = None):
         super().__init__(
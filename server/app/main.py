@@ -7,7 +7,7 @@ from app.core.config import Settings
 from app.api.v1.auth import router
 from app.middleware.auth_middleware import AuthMiddleware
 from app.api.v1.document import document_router
-from app.services.pinecone_service import PineconeService
+from app.services.vector_store import create_vector_store
 from app.api.v1.query import query_router
 
 from app.middleware.exception_handler_middleware import register_exception_handlers
@@ -32,11 +32,11 @@ async def lifespan(app: FastAPI):
         print("Redis connected successfully")
         
         
-        # 3. Pinecone - manual lifecycle management
-        pinecone_service = PineconeService()
-        await pinecone_service.connect()
-        app.state.pinecone_service = pinecone_service
-        print("Pinecone connected successfully")
+        # 3. Vector store (Pinecone or local, per settings) - manual lifecycle management
+        vector_store = create_vector_store()
+        await vector_store.connect()
+        app.state.vector_store = vector_store
+        print(f"Vector store ({settings.vector_store_backend}) connected successfully")
         
         
         print("All services initialized successfully")
@@ -52,12 +52,12 @@ async def lifespan(app: FastAPI):
     
     # Shutdown phase - cleanup in reverse order
     try:
-        # 3. Pinecone (last in, first out)
-        if hasattr(app.state, 'pinecone_service'):
-            await app.state.pinecone_service.disconnect()
-            print("Pinecone disconnected successfully")
+        # 3. Vector store (last in, first out)
+        if hasattr(app.state, 'vector_store'):
+            await app.state.vector_store.disconnect()
+            print("Vector store disconnected successfully")
     except Exception as e:
-        print(f"Error disconnecting Pinecone: {str(e)}")
+        print(f"Error disconnecting vector store: {str(e)}")
     
     try:
         # 2. Redis
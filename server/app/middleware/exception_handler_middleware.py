@@ -11,6 +11,7 @@ from app.core.exceptions import (
     AuthorizationError,
     ResourceNotFoundError,
     ResourceAlreadyExistsError,
+    DocumentBusyError,
     ValidationError,
     DatabaseError,
     ExternalServiceError,
@@ -55,6 +56,7 @@ def map_exception_to_status_code(exc: DomainException) -> int:
         AuthorizationError: status.HTTP_403_FORBIDDEN,
         ResourceNotFoundError: status.HTTP_404_NOT_FOUND,
         ResourceAlreadyExistsError: status.HTTP_409_CONFLICT,
+        DocumentBusyError: status.HTTP_409_CONFLICT,
         ValidationError: status.HTTP_422_UNPROCESSABLE_ENTITY,
         DatabaseError: status.HTTP_500_INTERNAL_SERVER_ERROR,
         ExternalServiceError: status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -1,15 +1,19 @@
 from datetime import datetime
 from typing import Optional, Dict, List
-from sqlalchemy import String, DateTime, Text, Enum as SQLEnum, Integer, ForeignKey, Boolean
+from sqlalchemy import String, DateTime, Text, Enum as SQLEnum, Integer, ForeignKey, Boolean, Computed, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 import uuid 
 import enum
 
 from app.core.database import Base
 
 
+# Text search configuration of DocumentChunk.search_vector - queries must use the same one
+SEARCH_CONFIG = 'english'
+
+
 class ProcessingStatus(str, enum.Enum):
     UPLOADED = 'uploaded'
     PROCESSING = "processing"
@@ -85,6 +89,23 @@ class Document(Base):
         default=None
     )
     
+    # SHA-256 of the uploaded bytes, used to reuse results for duplicate uploads
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True,
+        default=None
+    )
+    
+    # Incremented each time a revised PDF replaces the document's content
+    version: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        init=False
+    )
+    
     chunks: Mapped[List["DocumentChunk"]] = relationship(
         "DocumentChunk",
         back_populates="document",
@@ -113,6 +134,9 @@ class Document(Base):
 class DocumentChunk(Base):
     """Document chunks with metadata and summaries"""
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        Index('ix_document_chunks_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     
     id: Mapped[str] = mapped_column(
         String(36),
@@ -132,14 +156,36 @@ class DocumentChunk(Base):
         nullable=True,
         index=True
     )
+    # Large payload - only loaded when explicitly undeferred, accidental lazy loads raise
     content: Mapped[Dict] = mapped_column(
         JSONB,
-        nullable=False
+        nullable=False,
+        deferred=True,
+        deferred_raiseload=True
     )
     summary: Mapped[str] = mapped_column(
         Text,
         nullable=False
     )
+    # SHA-256 of the chunk's extracted content, used to diff document versions
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        index=True,
+        default=None
+    )
+    # Full-text index over the summary and the raw chunk text, maintained by Postgres
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"to_tsvector('{SEARCH_CONFIG}', coalesce(summary, '') || ' ' || coalesce(content ->> 'raw_text', ''))",
+            persisted=True
+        ),
+        nullable=True,
+        deferred=True,
+        deferred_raiseload=True,
+        init=False
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
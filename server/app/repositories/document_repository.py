@@ -1,15 +1,40 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func, update
-from typing import List, Optional
+from sqlalchemy import select, delete, func, update, or_, text
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from app.models.document import Document, DocumentChunk, ProcessingStatus
 from app.core.exceptions import DocumentNotFoundError, DatabaseError, ChunkNotFoundError
+from app.core.config import get_settings
+import json
 import logging
+import time
+import uuid
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 logger = logging.getLogger(__name__)
 
 
+class ChunkSummaryRow(NamedTuple):
+    """Lightweight chunk projection for the RAG path - never carries chunk content"""
+    embedding_id: str
+    summary: str
+
+
+class ScoredChunkRow(NamedTuple):
+    """Chunk summary ranked by cosine similarity to a query embedding"""
+    embedding_id: str
+    summary: str
+    score: float
+    embedding: Optional[List[float]] = None
+
+
+def vector_literal(embedding: List[float]) -> str:
+    """pgvector text representation, bound as text and cast to vector in SQL"""
+    return json.dumps([float(value) for value in embedding], separators=(",", ":"))
+
+
 class DocumentRepository:
     """Handles all database operations for documents"""
     
@@ -25,6 +50,17 @@ class DocumentRepository:
             logger.error(f"Failed to create document: {str(e)}")
             raise DatabaseError("create document", str(e))
     
+    async def update(self, document: Document, db: AsyncSession) -> Document:
+        """Persist changes made to a loaded document"""
+        try:
+            await db.commit()
+            await db.refresh(document)
+            return document
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to update document: {str(e)}")
+            raise DatabaseError("update document", str(e))
+    
     async def get_by_id(
         self, 
         document_id: str, 
@@ -50,6 +86,30 @@ class DocumentRepository:
             raise DocumentNotFoundError(document_id)
         return document                
     
+    async def get_completed_by_content_hash(
+        self,
+        content_hash: str,
+        user_id: str,
+        db: AsyncSession
+    ) -> Optional[Document]:
+        """Get the user's oldest fully processed document with the same content hash"""
+        try:
+            stmt = (
+                select(Document)
+                .where(
+                    Document.content_hash == content_hash,
+                    Document.user_id == user_id,
+                    Document.processing_status == ProcessingStatus.COMPLETED
+                )
+                .order_by(Document.created_at)
+                .limit(1)
+            )
+            result = await db.execute(stmt)
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Failed to fetch document by content hash: {str(e)}")
+            raise DatabaseError("fetch document by content hash", str(e))
+    
     async def get_user_document(
         self,
         user_id: str,
@@ -75,6 +135,46 @@ class DocumentRepository:
             logger.error(f"Failed to fetch user document: {str(e)}")
             raise DatabaseError("fetch user document", str(e))
     
+    async def start_new_version(
+        self,
+        document: Document,
+        values: Dict[str, Any],
+        db: AsyncSession
+    ) -> bool:
+        """
+        Apply a new version's columns and queue the document again, unless a run is still in
+        flight (uploaded or processing). Returns False, changing nothing, if one is.
+        """
+        try:
+            stmt = (
+                update(Document)
+                .where(
+                    Document.id == document.id,
+                    Document.processing_status.notin_([ProcessingStatus.UPLOADED, ProcessingStatus.PROCESSING])
+                )
+                .values(processing_status=ProcessingStatus.UPLOADED, error_message=None, **values)
+            )
+            result = await db.execute(stmt)
+            await db.commit()
+            if result.rowcount == 0:
+                return False
+            await db.refresh(document)
+            return True
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to start new version of document {document.id}: {str(e)}")
+            raise DatabaseError("start new document version", str(e))
+    
+    async def is_cloudinary_asset_used(self, public_id: str, db: AsyncSession) -> bool:
+        """Whether any document (e.g. a duplicate upload) still points at the stored file"""
+        try:
+            stmt = select(Document.id).where(Document.cloudinary_public_id == public_id).limit(1)
+            result = await db.execute(stmt)
+            return result.scalar_one_or_none() is not None
+        except Exception as e:
+            logger.error(f"Failed to check usage of Cloudinary asset {public_id}: {str(e)}")
+            raise DatabaseError("check cloudinary asset usage", str(e))
+    
     async def get_user_documents(
         self,
         user_id: str,
@@ -170,6 +270,23 @@ class DocumentRepository:
             logger.error(f"Failed to verify ownership: {str(e)}")
             raise DatabaseError("verify document ownership", str(e))
 
+    async def get_document_owners(
+        self,
+        after_id: Optional[str],
+        limit: int,
+        db: AsyncSession
+    ) -> List[Tuple[str, str]]:
+        """(document id, user id) pairs ordered by document id, one keyset page after `after_id`"""
+        try:
+            stmt = select(Document.id, Document.user_id).order_by(Document.id).limit(limit)
+            if after_id is not None:
+                stmt = stmt.where(Document.id > after_id)
+            result = await db.execute(stmt)
+            return [tuple(row) for row in result.all()]
+        except Exception as e:
+            logger.error(f"Failed to fetch document owners: {str(e)}")
+            raise DatabaseError("fetch document owners", str(e))
+
     async def save_insights(self, document_id: str, insights: dict) -> None:
         try:
             await self.db.execute(
@@ -185,41 +302,298 @@ class DocumentRepository:
 class DocumentChunkRepository:
     """Handles database operations for document chunks"""
     
+    # Columns written by the bulk paths; created_at is left to the server default
+    BULK_COLUMNS = ("id", "document_id", "embedding_id", "content", "summary", "content_hash")
+    # Columns refreshed when a chunk is written again under the same vector ID
+    UPSERT_COLUMNS = ("document_id", "content", "summary", "content_hash")
+
     async def create_bulk(
         self,
         chunks: List[DocumentChunk],
         db: AsyncSession
-    ) -> List[DocumentChunk]:
-        """Create multiple chunks"""
+    ) -> Dict[str, Any]:
+        """Create multiple chunks in a single set-based insert and commit"""
+        rows = [
+            {
+                "document_id": chunk.document_id,
+                "embedding_id": chunk.embedding_id,
+                "content": chunk.content,
+                "summary": chunk.summary,
+                "content_hash": chunk.content_hash
+            }
+            for chunk in chunks
+        ]
         try:
-            db.add_all(chunks)
+            stats = await self.insert_bulk(rows, db)
             await db.commit()
-            
-            # Refresh all chunks
-            for chunk in chunks:
-                await db.refresh(chunk)
-            
-            return chunks
-        except Exception as e:
+            return stats
+        except DatabaseError:
+            await db.rollback()
+            raise
+        except SQLAlchemyError as e:
             await db.rollback()
             logger.error(f"Failed to create chunks: {str(e)}")
             raise DatabaseError("create chunks", str(e))
+
+    async def insert_bulk(
+        self,
+        rows: List[Dict[str, Any]],
+        db: AsyncSession,
+        embeddings: Optional[Dict[str, List[float]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Upsert chunk rows without loading ORM objects or refreshing them.
+        Uses one multi-row INSERT ... ON CONFLICT (embedding_id) DO UPDATE ... RETURNING per
+        `chunk_insert_batch_size` rows, or COPY through a staging table once a batch reaches
+        `chunk_copy_min_rows`. Rewriting a chunk with the same vector ID updates it in place,
+        so retries and reprocessing are idempotent. `embeddings` (by vector ID) are written to
+        the pgvector column in the same transaction. Does not commit.
+        Returns the written ids and the throughput.
+        """
+        if not rows:
+            return {"ids": [], "rows": 0, "elapsed_seconds": 0.0, "rows_per_second": 0.0}
+
+        settings = get_settings()
+        start_time = time.monotonic()
+        rows = self._dedupe_by_embedding_id(rows)
+
+        try:
+            if len(rows) >= settings.chunk_copy_min_rows:
+                ids = await self._copy_rows(rows, db)
+            else:
+                ids = []
+                batch_size = settings.chunk_insert_batch_size
+                stmt = pg_insert(DocumentChunk)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[DocumentChunk.embedding_id],
+                    set_={column: stmt.excluded[column] for column in self.UPSERT_COLUMNS}
+                ).returning(DocumentChunk.id)
+                for start in range(0, len(rows), batch_size):
+                    result = await db.execute(stmt, rows[start:start + batch_size])
+                    ids.extend(result.scalars().all())
+
+            if embeddings:
+                await self.set_embeddings(embeddings, db)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to bulk insert chunks: {str(e)}")
+            raise DatabaseError("bulk insert chunks", str(e))
+
+        elapsed = time.monotonic() - start_time
+        rows_per_second = round(len(ids) / elapsed, 1) if elapsed > 0 else float(len(ids))
+        logger.debug(f"Wrote {len(ids)} chunks in {elapsed:.3f}s ({rows_per_second} rows/s)")
+        return {
+            "ids": ids,
+            "rows": len(ids),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": rows_per_second
+        }
+
+    async def set_embeddings(
+        self,
+        embeddings: Dict[str, List[float]],
+        db: AsyncSession
+    ) -> int:
+        """Write pgvector embeddings onto existing chunk rows by vector ID, in one statement. Does not commit."""
+        if not embeddings:
+            return 0
+
+        try:
+            result = await db.execute(
+                text(
+                    "UPDATE document_chunks AS chunk SET embedding = CAST(v.embedding AS vector) "
+                    "FROM unnest(CAST(:embedding_ids AS text[]), CAST(:embeddings AS text[])) "
+                    "AS v(embedding_id, embedding) "
+                    "WHERE chunk.embedding_id = v.embedding_id"
+                ),
+                {
+                    "embedding_ids": list(embeddings.keys()),
+                    "embeddings": [vector_literal(embedding) for embedding in embeddings.values()]
+                }
+            )
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Failed to write chunk embeddings: {str(e)}")
+            raise DatabaseError("write chunk embeddings", str(e))
+
+    async def get_embeddings(
+        self,
+        embedding_ids: List[str],
+        db: AsyncSession
+    ) -> Dict[str, List[float]]:
+        """pgvector embeddings by vector ID. Chunks without an embedding are left out."""
+        if not embedding_ids:
+            return {}
+
+        try:
+            result = await db.execute(
+                text(
+                    "SELECT embedding_id, CAST(embedding AS text) FROM document_chunks "
+                    "WHERE embedding_id = ANY(CAST(:embedding_ids AS text[])) AND embedding IS NOT NULL"
+                ),
+                {"embedding_ids": embedding_ids}
+            )
+            return {embedding_id: json.loads(embedding) for embedding_id, embedding in result.all()}
+        except Exception as e:
+            logger.error(f"Failed to fetch chunk embeddings: {str(e)}")
+            raise DatabaseError("fetch chunk embeddings", str(e))
+
+    async def clear_embeddings(
+        self,
+        embedding_ids: List[str],
+        db: AsyncSession
+    ) -> int:
+        """Remove pgvector embeddings from chunk rows by vector ID. Does not commit."""
+        if not embedding_ids:
+            return 0
+
+        try:
+            result = await db.execute(
+                text(
+                    "UPDATE document_chunks SET embedding = NULL "
+                    "WHERE embedding_id = ANY(CAST(:embedding_ids AS text[])) AND embedding IS NOT NULL"
+                ),
+                {"embedding_ids": embedding_ids}
+            )
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Failed to clear chunk embeddings: {str(e)}")
+            raise DatabaseError("clear chunk embeddings", str(e))
+
+    @staticmethod
+    def _dedupe_by_embedding_id(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # One statement can't upsert the same key twice - the last row for a vector ID wins
+        by_embedding_id: Dict[str, Dict[str, Any]] = {}
+        without_embedding = []
+        for row in rows:
+            if row.get("embedding_id"):
+                by_embedding_id[row["embedding_id"]] = row
+            else:
+                without_embedding.append(row)
+        return [*by_embedding_id.values(), *without_embedding]
+
+    async def _copy_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        db: AsyncSession
+    ) -> List[str]:
+        """
+        COPY rows into a temporary staging table over the session's own connection (same transaction),
+        then upsert them into document_chunks in one statement
+        """
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        records = [
+            (
+                row.get("id") or str(uuid.uuid4()),
+                row["document_id"],
+                row.get("embedding_id"),
+                json.dumps(row["content"]),
+                row["summary"],
+                row.get("content_hash")
+            )
+            for row in rows
+        ]
+
+        table = DocumentChunk.__tablename__
+        staging_table = f"_{table}_copy_{uuid.uuid4().hex[:12]}"
+        columns = ", ".join(self.BULK_COLUMNS)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in self.UPSERT_COLUMNS)
+
+        try:
+            await driver_connection.execute(
+                f"CREATE TEMP TABLE {staging_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            await driver_connection.copy_records_to_table(
+                staging_table,
+                records=records,
+                columns=list(self.BULK_COLUMNS)
+            )
+            written = await driver_connection.fetch(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table} "
+                f"ON CONFLICT (embedding_id) DO UPDATE SET {updates} RETURNING id"
+            )
+        except Exception as e:
+            logger.error(f"Failed to COPY chunks: {str(e)}")
+            raise DatabaseError("copy chunks", str(e))
+        return [record["id"] for record in written]
+
+    async def get_by_document_id(
+        self,
+        document_id: str,
+        db: AsyncSession,
+        include_content: bool = False
+    ) -> List[DocumentChunk]:
+        """Get all chunks of a document. `content` is only loaded when include_content is set."""
+        try:
+            stmt = (
+                select(DocumentChunk)
+                .where(DocumentChunk.document_id == document_id)
+                .order_by(DocumentChunk.created_at, DocumentChunk.id)
+            )
+            if include_content:
+                stmt = stmt.options(undefer(DocumentChunk.content))
+            result = await db.execute(stmt)
+            return result.scalars().all()
+        except Exception as e:
+            logger.error(f"Failed to fetch chunks for document {document_id}: {str(e)}")
+            raise DatabaseError("fetch chunks by document ID", str(e))
+    
+    async def delete_by_ids(
+        self,
+        chunk_ids: List[str],
+        db: AsyncSession
+    ) -> int:
+        """Delete chunks by ID without committing - the caller owns the transaction"""
+        if not chunk_ids:
+            return 0
+        
+        try:
+            result = await db.execute(
+                delete(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids))
+            )
+            return result.rowcount
+        except Exception as e:
+            logger.error(f"Failed to delete chunks: {str(e)}")
+            raise DatabaseError("delete chunks", str(e))
+    
+    async def document_references_blob(
+        self,
+        document_id: str,
+        blob_key: str,
+        db: AsyncSession
+    ) -> bool:
+        """Check whether any chunk of the document references the blob"""
+        try:
+            stmt = select(DocumentChunk.id).where(
+                DocumentChunk.document_id == document_id,
+                or_(
+                    DocumentChunk.content['image_refs'].contains([{'key': blob_key}]),
+                    DocumentChunk.content['table_refs'].contains([{'key': blob_key}])
+                )
+            ).limit(1)
+            result = await db.execute(stmt)
+            return result.scalar_one_or_none() is not None
+        except Exception as e:
+            logger.error(f"Failed to check blob reference: {str(e)}")
+            raise DatabaseError("check blob reference", str(e))
     
     async def get_by_embedding_ids(
         self,
         embedding_ids: List[str],
         db: AsyncSession
-    ) -> List[DocumentChunk]:
-        """Get chunks by embedding IDs"""
+    ) -> List[ChunkSummaryRow]:
+        """Get embedding ID and summary of chunks by embedding IDs"""
         if not embedding_ids:
             return []
         
         try:
-            stmt = select(DocumentChunk).where(
+            stmt = select(DocumentChunk.embedding_id, DocumentChunk.summary).where(
                 DocumentChunk.embedding_id.in_(embedding_ids)
             )
             result = await db.execute(stmt)
-            chunks = result.scalars().all()
+            chunks = [ChunkSummaryRow(*row) for row in result.all()]
             
             if not chunks:
                 raise ChunkNotFoundError(embedding_ids)
@@ -1,14 +1,32 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, text, func, desc, literal_column
+from typing import List, Optional, Set, Tuple
+import functools
+import json
 import logging
+import re
 
 from app.models.query import QueryResponse
-from app.models.document import DocumentChunk
+from app.models.document import DocumentChunk, SEARCH_CONFIG
+from app.repositories.document_repository import ChunkSummaryRow, ScoredChunkRow, vector_literal
 from app.core.exceptions import DatabaseError, ChunkNotFoundError
 
 logger = logging.getLogger(__name__)
 
+_QUOTED_PHRASE = re.compile(r'"([^"]*)"')
+
+
+def _split_search_terms(query_text: str) -> Tuple[List[str], List[str], List[str]]:
+    """Split websearch-style text into (words, quoted phrases, -excluded words)"""
+    phrases = [phrase for phrase in _QUOTED_PHRASE.findall(query_text) if phrase.strip()]
+    words, excluded = [], []
+    for token in _QUOTED_PHRASE.sub(" ", query_text).split():
+        if token.startswith("-") and len(token) > 1:
+            excluded.append(token[1:])
+        elif token.lower() != "or":
+            words.append(token)
+    return words, phrases, excluded
+
 
 class QueryRepository:
     """Handles database operations for queries"""
@@ -49,18 +67,21 @@ class QueryRepository:
     async def get_chunks_by_embedding_ids(
         self,
         embedding_ids: List[str],
-        db: AsyncSession
-    ) -> List[DocumentChunk]:
-        """Get chunks by embedding IDs"""
+        db: AsyncSession,
+        document_id: Optional[str] = None
+    ) -> List[ChunkSummaryRow]:
+        """Get embedding ID and summary of chunks by embedding IDs, optionally only those of one document"""
         if not embedding_ids:
             return []
         
         try:
-            stmt = select(DocumentChunk).where(
+            stmt = select(DocumentChunk.embedding_id, DocumentChunk.summary).where(
                 DocumentChunk.embedding_id.in_(embedding_ids)
             )
+            if document_id is not None:
+                stmt = stmt.where(DocumentChunk.document_id == document_id)
             result = await db.execute(stmt)
-            chunks = result.scalars().all()
+            chunks = [ChunkSummaryRow(*row) for row in result.all()]
             
             if not chunks:
                 raise ChunkNotFoundError(embedding_ids)
@@ -70,4 +91,121 @@ class QueryRepository:
             raise  # Re-raise domain exception
         except Exception as e:
             logger.error(f"Failed to fetch chunks: {str(e)}")
-            raise DatabaseError("fetch chunks by embedding IDs", str(e))
\ No newline at end of file
+            raise DatabaseError("fetch chunks by embedding IDs", str(e))
+    
+    async def get_document_embedding_ids(
+        self,
+        embedding_ids: List[str],
+        document_id: str,
+        db: AsyncSession
+    ) -> Set[str]:
+        """The subset of embedding IDs that belong to the document's chunks"""
+        if not embedding_ids:
+            return set()
+        
+        try:
+            stmt = select(DocumentChunk.embedding_id).where(
+                DocumentChunk.embedding_id.in_(embedding_ids),
+                DocumentChunk.document_id == document_id
+            )
+            result = await db.execute(stmt)
+            return set(result.scalars().all())
+        except Exception as e:
+            logger.error(f"Failed to filter embedding IDs for document {document_id}: {str(e)}")
+            raise DatabaseError("filter embedding IDs by document", str(e))
+    
+    async def search_similar_chunks(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        db: AsyncSession,
+        document_id: Optional[str] = None,
+        include_embeddings: bool = False
+    ) -> List[ScoredChunkRow]:
+        """
+        Nearest chunk summaries by cosine similarity over document_chunks.embedding (pgvector),
+        in a single query. Unscoped searches use the HNSW index. A document scope is applied first,
+        in a materialized CTE, and its chunks are ranked exactly: the HNSW index would return the
+        global nearest neighbours and filter them afterwards, leaving a small document with fewer
+        than top_k matches or none.
+        """
+        columns = "embedding_id, summary, 1 - (embedding <=> CAST(:query_embedding AS vector)) AS score"
+        if include_embeddings:
+            columns += ", CAST(embedding AS text) AS embedding"
+        params = {"query_embedding": vector_literal(query_embedding), "top_k": top_k}
+        scope, source = "", "document_chunks"
+        if document_id is not None:
+            scope = (
+                "WITH scoped_chunks AS MATERIALIZED ("
+                "SELECT embedding_id, summary, embedding FROM document_chunks "
+                "WHERE document_id = :document_id AND embedding IS NOT NULL) "
+            )
+            source = "scoped_chunks"
+            params["document_id"] = document_id
+        
+        try:
+            result = await db.execute(
+                text(
+                    f"{scope}SELECT {columns} "
+                    f"FROM {source} WHERE embedding IS NOT NULL "
+                    "ORDER BY embedding <=> CAST(:query_embedding AS vector) "
+                    "LIMIT :top_k"
+                ),
+                params
+            )
+            return [
+                ScoredChunkRow(row[0], row[1], row[2], json.loads(row[3]) if include_embeddings else None)
+                for row in result.all()
+            ]
+        except Exception as e:
+            logger.error(f"Failed to search chunks by embedding: {str(e)}")
+            raise DatabaseError("search chunks by embedding", str(e))
+    
+    async def search_chunks_by_text(
+        self,
+        query_text: str,
+        document_id: str,
+        top_k: int,
+        db: AsyncSession
+    ) -> List[ScoredChunkRow]:
+        """
+        Full-text search over the document's chunk summaries and raw text (GIN index on search_vector),
+        ranked by ts_rank_cd. Words and quoted phrases are OR-ed so a question matches chunks holding
+        any of its key terms; -excluded words rule chunks out, as in websearch syntax.
+        """
+        words, phrases, excluded = _split_search_terms(query_text)
+        if not words and not phrases:
+            return []
+        
+        # Inlined rather than bound, so Postgres reads the configuration as a regconfig
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        # Each term is normalized by the dictionary on its own, then combined as tsqueries - never as text
+        ts_query = functools.reduce(func.tsquery_or, [
+            *(func.plainto_tsquery(config, word) for word in words),
+            *(func.phraseto_tsquery(config, phrase) for phrase in phrases),
+        ])
+        if excluded:
+            ts_query = func.tsquery_and(
+                ts_query,
+                func.tsquery_not(functools.reduce(func.tsquery_or, [
+                    func.plainto_tsquery(config, word) for word in excluded
+                ]))
+            )
+        rank = func.ts_rank_cd(DocumentChunk.search_vector, ts_query).label('rank')
+        
+        try:
+            stmt = (
+                select(DocumentChunk.embedding_id, DocumentChunk.summary, rank)
+                .where(
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.embedding_id.is_not(None),
+                    DocumentChunk.search_vector.op('@@')(ts_query)
+                )
+                .order_by(desc(rank))
+                .limit(top_k)
+            )
+            result = await db.execute(stmt)
+            return [ScoredChunkRow(*row) for row in result.all()]
+        except Exception as e:
+            logger.error(f"Failed to search chunks by text: {str(e)}")
+            raise DatabaseError("search chunks by text", str(e))
@@ -3,7 +3,7 @@ Pydantic schemas for document-related API operations
 """
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from app.models.document import ProcessingStatus
 
 class DocumentUploadResponse(BaseModel):
@@ -19,12 +19,47 @@ class DocumentUploadResponse(BaseModel):
     message: str
 
 
+class IngestionStageProgress(BaseModel):
+    """Time a pipeline stage spent working, excluding waits on its input"""
+    busy_seconds: float
+    finished: bool
+
+class ChunkCacheStatsResponse(BaseModel):
+    """Cluster-wide chunk cache counters"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    hit_rate: float = 0.0
+    entries: int = 0
+
+class IngestionProgress(BaseModel):
+    """Live ingestion progress published by the worker"""
+    state: str
+    stage: str
+    pages_total: int = 0
+    pages_parsed: int = 0
+    chunks_parsed: int = 0
+    chunks_skipped: int = 0
+    chunks_summarized: int = 0
+    chunk_cache_hits: int = 0
+    chunk_cache_misses: int = 0
+    chunks_embedded: int = 0
+    vectors_upserted: int = 0
+    chunks_persisted: int = 0
+    elapsed_seconds: float = 0.0
+    stages: Dict[str, IngestionStageProgress] = Field(default_factory=dict)
+    percent_complete: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    updated_at: Optional[float] = None
+
 class DocumentStatusResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
     document_id: str
     processing_status: ProcessingStatus
     error_message: Optional[str] = None
+    progress: Optional[IngestionProgress] = None
+    poll_after_seconds: Optional[int] = None
 
 class DocumentListItem(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -41,6 +76,7 @@ class DocumentListItem(BaseModel):
     insights_available: bool
     insights: Optional[dict] = None
     error_message : Optional[str] = None
+    version: int = 1
 
 
 class DocumentListResponse(BaseModel):
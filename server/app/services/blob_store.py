@@ -0,0 +1,196 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import mimetypes
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import aiofiles
+from app.core.config import get_settings
+from app.core.exceptions import BlobNotFoundError, BlobStoreError
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage for large chunk payloads (images, big tables).
+    Keys are `<sha256>.<ext>`, so identical payloads are stored once.
+    """
+
+    @abstractmethod
+    async def _exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def _write(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Return the blob's bytes - raises BlobNotFoundError"""
+        ...
+
+    @staticmethod
+    def make_key(data: bytes, content_type: str) -> str:
+        extension = mimetypes.guess_extension(content_type) or ".bin"
+        return f"{hashlib.sha256(data).hexdigest()}{extension}"
+
+    @staticmethod
+    def content_type_for(key: str) -> str:
+        return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    async def put(self, data: bytes, content_type: str) -> str:
+        """Store data and return its key; a blob that already exists is not written again"""
+        key = self.make_key(data, content_type)
+        try:
+            if not await self._exists(key):
+                await self._write(key, data, content_type)
+            return key
+        except Exception as e:
+            logger.error(f"Blob store write failed: {str(e)}")
+            raise BlobStoreError("put", str(e))
+
+    async def externalize_chunk_content(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Move images and large tables out of chunk content into the store,
+        leaving references that the blob endpoint can serve lazily.
+        """
+        settings = get_settings()
+        externalized = {
+            key: value for key, value in content.items()
+            if key not in ('image_base64', 'tables_html')
+        }
+
+        image_refs: List[Dict[str, Any]] = []
+        for image_base64 in content.get('image_base64', []):
+            data = base64.b64decode(image_base64)
+            image_refs.append({
+                'key': await self.put(data, "image/jpeg"),
+                'size': len(data)
+            })
+
+        tables_html: List[str] = []
+        table_refs: List[Dict[str, Any]] = []
+        for table_html in content.get('tables_html', []):
+            data = table_html.encode('utf-8')
+            if len(data) <= settings.blob_inline_table_max_bytes:
+                tables_html.append(table_html)
+            else:
+                table_refs.append({
+                    'key': await self.put(data, "text/html"),
+                    'size': len(data)
+                })
+
+        externalized['image_refs'] = image_refs
+        externalized['tables_html'] = tables_html
+        externalized['table_refs'] = table_refs
+        return externalized
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a local (or shared-volume) directory"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if "/" in key or key.startswith("."):
+            raise BlobNotFoundError(key)
+        # Fan out into sub-directories to keep directory sizes sane
+        return self.root / key[:2] / key[2:4] / key
+
+    async def _exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    async def _write(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.partial")
+        async with aiofiles.open(partial, 'wb') as blob_file:
+            await blob_file.write(data)
+        partial.replace(path)
+
+    async def get(self, key: str) -> bytes:
+        path = self._path(key)
+        if not path.exists():
+            raise BlobNotFoundError(key)
+        try:
+            async with aiofiles.open(path, 'rb') as blob_file:
+                return await blob_file.read()
+        except Exception as e:
+            logger.error(f"Blob store read failed: {str(e)}")
+            raise BlobStoreError("get", str(e))
+
+
+class S3BlobStore(BlobStore):
+    """Blobs in an S3-compatible bucket (AWS S3, MinIO, R2...). Requires boto3."""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        region: Optional[str] = None
+    ):
+        try:
+            import boto3
+        except ImportError:
+            raise BlobStoreError("configure", "blob_store_backend='s3' requires the boto3 package")
+
+        self.bucket = bucket
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+
+    async def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self._client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    async def _write(self, key: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(
+            self._client.put_object,
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type
+        )
+
+    async def get(self, key: str) -> bytes:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = await asyncio.to_thread(self._client.get_object, Bucket=self.bucket, Key=key)
+            return await asyncio.to_thread(response["Body"].read)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise BlobNotFoundError(key)
+            logger.error(f"Blob store read failed: {str(e)}")
+            raise BlobStoreError("get", str(e))
+
+
+@lru_cache
+def get_blob_store() -> BlobStore:
+    """Blob store selected by `blob_store_backend`"""
+    settings = get_settings()
+    if settings.blob_store_backend == "s3":
+        return S3BlobStore(
+            bucket=settings.blob_store_s3_bucket,
+            endpoint_url=settings.blob_store_s3_endpoint_url,
+            access_key=settings.blob_store_s3_access_key,
+            secret_key=settings.blob_store_s3_secret_key,
+            region=settings.blob_store_s3_region
+        )
+    return LocalBlobStore(settings.blob_store_local_dir)
@@ -0,0 +1,147 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.core.config import get_settings
+from app.core.redis_client import redis_client
+from app.services.chunk_cache_service import encode_embedding, decode_embedding
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionCheckpointService:
+    """
+    Redis checkpoints of one document's ingestion, so a retried task resumes from the last
+    completed unit instead of starting over: the extracted content of every parsed chunk,
+    each summarized and embedded chunk, and the vector IDs already upserted.
+    Scoped to the PDF's content hash, so a new version never resumes an old one.
+    Best effort - when Redis is unavailable the document is simply processed from scratch.
+    """
+
+    def __init__(self, document_id: str, content_hash: Optional[str]):
+        self.settings = get_settings()
+        base = f"{self.settings.redis_prefix}ingestion_checkpoint:{document_id}:{content_hash or 'none'}:"
+        self.meta_key = f"{base}meta"
+        self.parsed_key = f"{base}parsed"
+        self.results_key = f"{base}results"
+        self.upserted_key = f"{base}upserted"
+
+        self.parse_complete = False
+        self.pages_total = 0
+        self.results: Dict[int, Dict[str, Any]] = {}
+        self.upserted: Set[str] = set()
+
+    @property
+    def _keys(self) -> List[str]:
+        return [self.meta_key, self.parsed_key, self.results_key, self.upserted_key]
+
+    async def load(self) -> None:
+        """Read what earlier attempts completed"""
+        try:
+            redis = redis_client.redis
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self.meta_key)
+                pipe.hgetall(self.results_key)
+                pipe.smembers(self.upserted_key)
+                meta, results, upserted = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to load ingestion checkpoint: {str(e)}")
+            return
+
+        self.parse_complete = meta.get('parse_complete') == '1'
+        self.pages_total = int(meta.get('pages_total', 0))
+        self.upserted = set(upserted)
+        for chunk_idx, raw in results.items():
+            saved = json.loads(raw)
+            saved['embedding'] = decode_embedding(saved['embedding'])
+            self.results[int(chunk_idx)] = saved
+
+        if self.results or self.parse_complete:
+            logger.info(
+                f"Resuming from checkpoint: parse {'complete' if self.parse_complete else 'incomplete'}, "
+                f"{len(self.results)} chunks embedded, {len(self.upserted)} vectors upserted"
+            )
+
+    async def parsed_contents(self) -> List[Dict[str, Any]]:
+        """Extracted content of every chunk, in chunk order (only meaningful once the parse completed)"""
+        return [json.loads(raw) for raw in await redis_client.redis.lrange(self.parsed_key, 0, -1)]
+
+    async def reset_parse(self) -> None:
+        """Drop a partial parse - parsing restarts from the first page"""
+        await self._run(lambda pipe: pipe.delete(self.parsed_key), "reset parse checkpoint")
+
+    async def save_parsed(self, contents: List[Dict[str, Any]]) -> bool:
+        """Append parsed chunks, in order, in one round trip. Returns whether they were saved."""
+        if not contents:
+            return True
+        return await self._run(
+            lambda pipe: pipe.rpush(self.parsed_key, *[json.dumps(content) for content in contents]),
+            "checkpoint parsed chunks"
+        )
+
+    async def save_parsed_batch(self, contents: List[Dict[str, Any]]) -> None:
+        """
+        Append parsed chunks in one round trip. Unlike the other writes this raises:
+        fanned-out chunk batches read their content from here instead of carrying it.
+        """
+        if not contents:
+            return
+        async with redis_client.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(self.parsed_key, *[json.dumps(content) for content in contents])
+            for key in self._keys:
+                pipe.expire(key, self.settings.ingestion_checkpoint_ttl)
+            await pipe.execute()
+
+    async def parsed_contents_at(self, chunk_indices: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Extracted content of the given chunks (None where missing)"""
+        async with redis_client.redis.pipeline(transaction=False) as pipe:
+            for chunk_idx in chunk_indices:
+                pipe.lindex(self.parsed_key, chunk_idx)
+            raw_contents = await pipe.execute()
+        return [json.loads(raw) if raw is not None else None for raw in raw_contents]
+
+    async def complete_parse(self, pages_total: int) -> None:
+        await self._run(
+            lambda pipe: pipe.hset(self.meta_key, mapping={'parse_complete': '1', 'pages_total': pages_total}),
+            "checkpoint parse"
+        )
+
+    async def save_results(self, results: Iterable[Dict[str, Any]]) -> None:
+        """Checkpoint summarized and embedded chunk results (without their content)"""
+        mapping = {
+            str(result['chunk_index']): json.dumps({
+                'chunk_id': result['chunk_id'],
+                'content_hash': result['content_hash'],
+                'cache_key': result['cache_key'],
+                'summary': result['summary'],
+                'embedding_id': result['embed_data']['embedding_id'],
+                'embedding': encode_embedding(result['embed_data']['embedding'])
+            })
+            for result in results
+        }
+        if mapping:
+            await self._run(lambda pipe: pipe.hset(self.results_key, mapping=mapping), "checkpoint chunk results")
+
+    async def save_upserted(self, embedding_ids: List[str]) -> None:
+        self.upserted.update(embedding_ids)
+        if embedding_ids:
+            await self._run(lambda pipe: pipe.sadd(self.upserted_key, *embedding_ids), "checkpoint upserted vectors")
+
+    async def clear(self) -> None:
+        """Forget the checkpoint once the document has been committed"""
+        try:
+            await redis_client.redis.delete(*self._keys)
+        except Exception as e:
+            logger.warning(f"Failed to clear ingestion checkpoint: {str(e)}")
+
+    async def _run(self, command, action: str) -> bool:
+        # Every write refreshes the TTL of the whole checkpoint
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                command(pipe)
+                for key in self._keys:
+                    pipe.expire(key, self.settings.ingestion_checkpoint_ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to {action}: {str(e)}")
+            return False
@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def encode_embedding(embedding: List[float]) -> str:
+    # float32 + base64 is ~4x smaller than a JSON list of floats
+    return base64.b64encode(array('f', embedding).tobytes()).decode('ascii')
+
+
+def decode_embedding(encoded: str) -> List[float]:
+    values = array('f')
+    values.frombytes(base64.b64decode(encoded))
+    return values.tolist()
+
+
+class ChunkCacheService:
+    """
+    Redis cache of chunk summaries and embeddings shared across documents.
+    Keyed by a hash of the chunk content plus model and prompt versions;
+    least recently used entries are evicted once `chunk_cache_max_entries` is exceeded.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.prefix = f"{self.settings.redis_prefix}chunk_cache:"
+        self.lru_key = f"{self.prefix}lru"
+        self.stats_key = f"{self.prefix}stats"
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, content_hash: str, version: str) -> str:
+        """Cache key from the chunk content hash and everything that shapes its summary/embedding"""
+        return hashlib.sha256(f"{version}:{content_hash}".encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {'summary', 'embedding'} for a cached chunk, or None. Cache errors count as misses."""
+        if not self.settings.chunk_cache_enabled:
+            return None
+
+        try:
+            redis = redis_client.redis
+            raw = await redis.get(f"{self.prefix}{key}")
+
+            if raw is None:
+                self.misses += 1
+                await redis.hincrby(self.stats_key, 'misses', 1)
+                return None
+
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.lru_key, {key: time.time()})
+                pipe.hincrby(self.stats_key, 'hits', 1)
+                await pipe.execute()
+
+            self.hits += 1
+            entry = json.loads(raw)
+            return {
+                'summary': entry['summary'],
+                'embedding': decode_embedding(entry['embedding'])
+            }
+        except Exception as e:
+            logger.warning(f"Chunk cache lookup failed: {str(e)}")
+            self.misses += 1
+            return None
+
+    async def set(self, key: str, summary: str, embedding: List[float]) -> None:
+        """Cache a chunk's summary and embedding, evicting least recently used entries when full"""
+        if not self.settings.chunk_cache_enabled:
+            return
+
+        try:
+            redis = redis_client.redis
+            entry = json.dumps({
+                'summary': summary,
+                'embedding': encode_embedding(embedding)
+            })
+
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(f"{self.prefix}{key}", entry)
+                pipe.zadd(self.lru_key, {key: time.time()})
+                pipe.zcard(self.lru_key)
+                *_, size = await pipe.execute()
+
+            excess = size - self.settings.chunk_cache_max_entries
+            if excess > 0:
+                evicted = await redis.zpopmin(self.lru_key, excess)
+                if evicted:
+                    await redis.delete(*[f"{self.prefix}{evicted_key}" for evicted_key, _ in evicted])
+                    await redis.hincrby(self.stats_key, 'evictions', len(evicted))
+        except Exception as e:
+            logger.warning(f"Chunk cache write failed: {str(e)}")
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and for the whole cluster"""
+        stats: Dict[str, Any] = {
+            'process_hits': self.hits,
+            'process_misses': self.misses,
+        }
+        try:
+            redis = redis_client.redis
+            cluster = await redis.hgetall(self.stats_key)
+            hits = int(cluster.get('hits', 0))
+            misses = int(cluster.get('misses', 0))
+            stats.update({
+                'hits': hits,
+                'misses': misses,
+                'evictions': int(cluster.get('evictions', 0)),
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'entries': await redis.zcard(self.lru_key),
+            })
+        except Exception as e:
+            logger.warning(f"Failed to read chunk cache stats: {str(e)}")
+        return stats
@@ -8,14 +8,18 @@ from app.repositories.document_repository import DocumentRepository
 from pathlib import Path
 from app.core.exceptions import (
     FileUploadError,
+    DocumentBusyError,
     DocumentProcessingError,
     UnsupportedFileTypeError,
     FileTooLargeError
 )
 from app.models.document import Document, ProcessingStatus
-from app.tasks.document_tasks import process_document_task
+from app.services.ingestion_scheduler import ingestion_scheduler
 from app.schemas.document import DocumentUploadResponse
+import aiofiles
+import hashlib
 import logging
+import os
     
 logger = logging.getLogger(__name__)
 
@@ -47,6 +51,39 @@ class DocumentProcessor:
             if file.size > max_bytes:
                 raise FileTooLargeError(self.max_file_size_mb)
     
+    async def _read_file(self, file: UploadFile) -> bytes:
+        """Validate the upload and return its content"""
+        # Validate file
+        self._validate_file(file)
+        
+        # Read file content
+        file_content = await file.read()
+        
+        # Validate actual file size
+        max_bytes = self.max_file_size_mb * 1024 * 1024
+        if len(file_content) > max_bytes:
+            raise FileTooLargeError(self.max_file_size_mb)
+        
+        return file_content
+    
+    async def _spool_upload(self, file_content: bytes, content_hash: str) -> None:
+        """Leave the upload on the shared volume so workers can skip downloading it again"""
+        if not self.settings.pdf_spool_dir:
+            return
+        
+        spool_dir = Path(self.settings.pdf_spool_dir)
+        target = spool_dir / f"{content_hash}.pdf"
+        partial = spool_dir / f"{content_hash}.pdf.partial"
+        try:
+            spool_dir.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(partial, 'wb') as spool_file:
+                await spool_file.write(file_content)
+            # Atomic rename - workers never see a half-written file
+            os.replace(partial, target)
+        except Exception as e:
+            # Workers fall back to downloading from Cloudinary
+            logger.warning(f"Failed to spool upload {content_hash}: {str(e)}")
+    
     async def process_document(
         self,
         file: UploadFile,
@@ -58,18 +95,17 @@ class DocumentProcessor:
         
         Raises domain exceptions that are handled by global middleware
         """
-        # Validate file
-        self._validate_file(file)
+        file_content = await self._read_file(file)
         
-        # Read file content
-        file_content = await file.read()
+        logger.info(f"Processing document: {file.filename} ({len(file_content)} bytes)")
         
-        # Validate actual file size
-        max_bytes = self.max_file_size_mb * 1024 * 1024
-        if len(file_content) > max_bytes:
-            raise FileTooLargeError(self.max_file_size_mb)
+        content_hash = hashlib.sha256(file_content).hexdigest()
         
-        logger.info(f"Processing document: {file.filename} ({len(file_content)} bytes)")
+        # Fast path: the user already had identical bytes processed - reuse their results.
+        # Never across users: the file, chunks and insights belong to the uploader's tenant.
+        existing = await self.document_repo.get_completed_by_content_hash(content_hash, user.id, db)
+        if existing:
+            return await self._process_duplicate(file, existing, content_hash, user, db)
         
         try:
             # Upload to Cloudinary
@@ -85,13 +121,16 @@ class DocumentProcessor:
                 details={"error": str(e)}
             )
         
+        await self._spool_upload(file_content, content_hash)
+        
         # Create document record
         document = Document(
             user_id=user.id,
             filename=Path(file.filename).stem,
             cloudinary_url=cloudinary_result['url'],
             cloudinary_public_id=cloudinary_result['public_id'],
-            file_size=cloudinary_result['size']
+            file_size=cloudinary_result['size'],
+            content_hash=content_hash
         )
         
         # Save to database via repository
@@ -101,8 +140,10 @@ class DocumentProcessor:
         
         # Queue background processing
         try:
-            task = process_document_task.delay(str(document.id))
-            logger.info(f"Queued processing task: {task.id}")
+            task_id = await ingestion_scheduler.submit(
+                'process_document', [str(document.id)], user.id, document.file_size
+            )
+            logger.info(f"Queued processing task: {task_id}")
         except Exception as e:
             logger.error(f"Failed to queue task: {str(e)}")
             # Don't fail the upload, document is saved
@@ -115,4 +156,121 @@ class DocumentProcessor:
             created_at=document.created_at,
             insights_available=document.insights_available,
             message="Document uploaded successfully. Processing in background."
-        )
\ No newline at end of file
+        )
+    
+    async def _process_duplicate(
+        self,
+        file: UploadFile,
+        existing: Document,
+        content_hash: str,
+        user: dict,
+        db: AsyncSession
+    ) -> DocumentUploadResponse:
+        """Create a document that reuses the stored file, chunks and vectors of an identical one"""
+        document = Document(
+            user_id=user.id,
+            filename=Path(file.filename).stem,
+            cloudinary_url=existing.cloudinary_url,
+            cloudinary_public_id=existing.cloudinary_public_id,
+            file_size=existing.file_size,
+            content_hash=content_hash
+        )
+        
+        document = await self.document_repo.create(document, db)
+        
+        logger.info(f"Document {document.id} is a duplicate of {existing.id}, cloning results")
+        
+        try:
+            task_id = await ingestion_scheduler.submit(
+                'clone_document', [str(document.id), str(existing.id)], user.id, document.file_size
+            )
+            logger.info(f"Queued clone task: {task_id}")
+        except Exception as e:
+            logger.error(f"Failed to queue task: {str(e)}")
+        
+        return DocumentUploadResponse(
+            document_id=document.id,
+            filename=document.filename,
+            cloudinary_url=document.cloudinary_url,
+            processing_status=ProcessingStatus.PROCESSING,
+            created_at=document.created_at,
+            insights_available=document.insights_available,
+            message="Document uploaded successfully. Processing in background."
+        )
+    
+    async def process_new_version(
+        self,
+        document_id: str,
+        file: UploadFile,
+        user: dict,
+        db: AsyncSession
+    ) -> DocumentUploadResponse:
+        """
+        Replace a document's PDF with a revised version.
+        
+        Only chunks that changed since the previous version are summarized and embedded again.
+        Rejected while a previous run is still queued or processing - two pipelines would race on
+        the same chunks. The previous version's file is deleted once the new one is processed.
+        """
+        document = await self.document_repo.get_user_document(user.id, document_id, db)
+        if document.processing_status in (ProcessingStatus.UPLOADED, ProcessingStatus.PROCESSING):
+            raise DocumentBusyError(document_id)
+        
+        file_content = await self._read_file(file)
+        version = document.version + 1
+        superseded_public_id = document.cloudinary_public_id
+        
+        logger.info(f"Processing version {version} of document {document_id} ({len(file_content)} bytes)")
+        
+        try:
+            # Own public id per version - overwriting would destroy the file the current chunks came from
+            cloudinary_result = await self.cloudinary_service.upload_pdf(
+                file_content,
+                f"{Path(file.filename).stem}_v{version}.pdf",
+                user.id
+            )
+        except Exception as e:
+            logger.error(f"Cloudinary upload failed: {str(e)}")
+            raise DocumentProcessingError(
+                "Failed to upload document to cloud storage",
+                details={"error": str(e)}
+            )
+        
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        await self._spool_upload(file_content, content_hash)
+        
+        started = await self.document_repo.start_new_version(document, {
+            'cloudinary_url': cloudinary_result['url'],
+            'cloudinary_public_id': cloudinary_result['public_id'],
+            'file_size': cloudinary_result['size'],
+            'content_hash': content_hash,
+            'version': version,
+            # Insights describe the previous version
+            'insights': None,
+            'insights_available': False,
+        }, db)
+        if not started:
+            # Another version was accepted while this one uploaded
+            try:
+                await self.cloudinary_service.delete_file(cloudinary_result['public_id'])
+            except Exception as e:
+                logger.warning(f"Failed to delete rejected upload {cloudinary_result['public_id']}: {str(e)}")
+            raise DocumentBusyError(document_id)
+        
+        try:
+            task_id = await ingestion_scheduler.submit(
+                'process_document_version', [str(document.id), superseded_public_id], user.id, document.file_size
+            )
+            logger.info(f"Queued version processing task: {task_id}")
+        except Exception as e:
+            logger.error(f"Failed to queue task: {str(e)}")
+        
+        return DocumentUploadResponse(
+            document_id=document.id,
+            filename=document.filename,
+            cloudinary_url=document.cloudinary_url,
+            processing_status=document.processing_status,
+            created_at=document.created_at,
+            insights_available=document.insights_available,
+            message=f"Version {document.version} uploaded successfully. Processing changed sections in background."
+        )
@@ -1,13 +1,16 @@
 from server.app.core.database import AsyncSession
 from app.models.document import Document, ProcessingStatus
 from app.repositories.document_repository import DocumentRepository, DocumentChunkRepository
-from app.schemas.document import DocumentListResponse, DocumentListItem,  ProcessingStatus
+from app.schemas.document import DocumentListResponse, DocumentListItem, DocumentStatusResponse, IngestionProgress, ProcessingStatus, ChunkCacheStatsResponse
 from app.schemas.query import ChunkSummaryDTO
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import logging
 from pydantic import ValidationError
 from app.schemas.insights import ContractInsights
-from app.core.exceptions import BadRequestError, ExternalServiceError
+from app.core.exceptions import BadRequestError, BlobNotFoundError, ExternalServiceError
+from app.services.blob_store import get_blob_store
+from app.services.progress_service import IngestionProgressService
+from app.services.chunk_cache_service import ChunkCacheService
 
 logger = logging.getLogger(__name__)
    
@@ -17,6 +20,8 @@ class DocumentService:
     def __init__(self):
         self.document_repo = DocumentRepository()
         self.chunk_repo = DocumentChunkRepository()
+        self.blob_store = get_blob_store()
+        self.progress_service = IngestionProgressService()
     
     async def get_user_documents(
         self,
@@ -41,6 +46,7 @@ class DocumentService:
                 updated_at=doc.updated_at,
                 insights=doc.insights,
                 insights_available=doc.insights_available,
+                version=doc.version,
             )
             for doc in documents
         ]
@@ -71,9 +77,42 @@ class DocumentService:
             updated_at=document.updated_at,
             processing_status=document.processing_status,
             insights_available=document.insights_available,
-            insights=document.insights
+            insights=document.insights,
+            version=document.version
         )
     
+    async def get_document_status(
+        self,
+        user_id: str,
+        document_id: str,
+        db: AsyncSession
+    ) -> DocumentStatusResponse:
+        """Processing status plus live pipeline progress and a suggested polling interval"""
+        document = await self.document_repo.get_user_document(user_id, document_id, db)
+
+        progress = None
+        poll_after_seconds = None
+        if document.processing_status in (ProcessingStatus.UPLOADED, ProcessingStatus.PROCESSING):
+            snapshot = await self.progress_service.get(document_id)
+            if snapshot:
+                progress = IngestionProgress(**snapshot)
+            # Poll roughly ten times over the remaining time, never more than every 2s
+            eta = progress.eta_seconds if progress else None
+            poll_after_seconds = int(min(max(eta / 10, 2), 30)) if eta else 5
+
+        return DocumentStatusResponse(
+            document_id=document.id,
+            processing_status=document.processing_status,
+            error_message=document.error_message,
+            progress=progress,
+            poll_after_seconds=poll_after_seconds
+        )
+    
+    async def get_chunk_cache_stats(self) -> ChunkCacheStatsResponse:
+        """Cluster-wide hit/miss counters of the shared chunk cache"""
+        # Per-process counters are meaningless for the API process, only the shared ones are returned
+        return ChunkCacheStatsResponse(**await ChunkCacheService().get_stats())
+    
     async def delete_user_document(
         self,
         user_id: str,
@@ -131,6 +170,23 @@ class DocumentService:
         logger.info(f"Retrieved {len(chunk_dtos)} chunk summaries for RAG")
         return chunk_dtos
     
+    async def get_document_blob(
+        self,
+        user_id: str,
+        document_id: str,
+        blob_key: str,
+        db: AsyncSession
+    ) -> Tuple[bytes, str]:
+        """Get an image/table blob referenced by one of the user's document chunks"""
+        # Repository handles errors and ownership check
+        await self.document_repo.get_user_document(user_id, document_id, db)
+        
+        if not await self.chunk_repo.document_references_blob(document_id, blob_key, db):
+            raise BlobNotFoundError(blob_key)
+        
+        data = await self.blob_store.get(blob_key)
+        return data, self.blob_store.content_type_for(blob_key)
+    
     async def verify_document_ownership(
         self,
         user_id: str,
@@ -1,22 +1,37 @@
 import asyncio
-from typing import List, Dict, Any
-from app.core.exceptions import RAGException, ExternalServiceError
+from typing import List, Dict, Any, Optional
+from app.core.exceptions import ExternalServiceError
 from langchain_google_genai import  GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from server.app.core.config import Settings
 import logging
-import time
+import random
 import uuid
 import json
 from app.utils.prompts import get_contract_analysis_prompt
+from app.services.rate_limiter import get_rate_limiter
+from app.services.chunk_cache_service import ChunkCacheService
+from app.utils.hashing import chunk_content_hash, chunk_vector_id
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever create_simple_prompt changes so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "v1"
+SUMMARY_FALLBACK_PREFIX = "Summary unavailable."
+
+RATE_LIMIT_MARKERS = ("rate limit", "quota", "429", "resource exhausted", "resource_exhausted")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in RATE_LIMIT_MARKERS)
+
+
 class GeminiService:
     
-    def __init__(self):
+    def __init__(self, budget: str = "ingestion"):
         self.settings = Settings()
 
         self.llm = ChatGoogleGenerativeAI(
@@ -34,33 +49,97 @@ class GeminiService:
 
         self.output_parser = StrOutputParser()
         
-        # Simple rate limiting variables
-        self.last_request_time = 0
-        self.min_delay_between_requests = 0.5  # 500ms delay between requests
-        self.batch_size = 3  # Process 3 chunks at a time
-        self.batch_delay = 2  # 2 second delay between batches
+        # Concurrency and quota limits - throughput is bounded by quota, not fixed sleeps
+        self.max_concurrency = self.settings.gemini_max_concurrency
+        # Shared with every other process using the same budget ("ingestion" or "query")
+        self.rate_limiter = get_rate_limiter(budget)
+        
+        self.chunk_cache = ChunkCacheService()
+        self.cache_version = (
+            f"{SUMMARY_PROMPT_VERSION}:{self.settings.gemini_model}:{self.settings.gemini_embedding_model}"
+        )
     
     
-    async def wait_for_rate_limit(self):
-        """Simple rate limiting - wait if needed."""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_delay_between_requests:
-            wait_time = self.min_delay_between_requests - time_since_last
-            logger.info(f"Rate limiting: waiting {wait_time:.2f}s")
-            await asyncio.sleep(wait_time)
-        
-        self.last_request_time = time.time()  
+    async def wait_for_rate_limit(self, estimated_tokens: int = 0):
+        """Wait until the request and token budgets allow another call."""
+        await self.rate_limiter.acquire(estimated_tokens)
+    
+    def estimate_tokens(self, content: Dict[str, Any]) -> int:
+        """Rough token estimate for a summary request (~4 chars per token, fixed cost per image)."""
+        prompt_tokens = len(self.create_simple_prompt(content)) // 4
+        image_tokens = 258 * len(content['images'][:2])
+        return prompt_tokens + image_tokens
            
     async def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
         try:
+            await self.wait_for_rate_limit(len(text) // 4)
             embedding = await self.embeddings.aembed_query(text)
+            await self.rate_limiter.record_success()
             return embedding
         except Exception as e:
+            if is_rate_limit_error(e):
+                await self.rate_limiter.record_rate_limited()
             return []
     
+    async def _embed_documents_batch(self, ids: List[str], texts: List[str]) -> Dict[str, List[float]]:
+        """Embed one batch; on failure fall back to per-item calls so one bad text only loses itself."""
+        try:
+            await self.wait_for_rate_limit(sum(len(text) for text in texts) // 4)
+            vectors = await self.embeddings.aembed_documents(texts)
+            await self.rate_limiter.record_success()
+            if len(vectors) == len(texts) and all(vectors):
+                return dict(zip(ids, vectors))
+            logger.warning(f"Embedding batch returned incomplete results, retrying {len(texts)} items individually")
+        except Exception as e:
+            if is_rate_limit_error(e):
+                await self.rate_limiter.record_rate_limited()
+            logger.warning(f"Embedding batch of {len(texts)} failed, retrying items individually: {e}")
+        
+        results = {}
+        for item_id, text in zip(ids, texts):
+            try:
+                await self.wait_for_rate_limit(len(text) // 4)
+                vectors = await self.embeddings.aembed_documents([text])
+                await self.rate_limiter.record_success()
+                if vectors and vectors[0]:
+                    results[item_id] = vectors[0]
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    await self.rate_limiter.record_rate_limited()
+                logger.error(f"Embedding failed for item {item_id}: {e}")
+        return results
+    
+    async def generate_embeddings_batch(self, items: Dict[str, str]) -> Dict[str, List[float]]:
+        """
+        Embed document texts in batches of `gemini_embedding_batch_size`.
+        Returns vectors keyed by the caller's IDs; items that failed are left out.
+        """
+        ids = list(items.keys())
+        texts = list(items.values())
+        batch_size = self.settings.gemini_embedding_batch_size
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_batch(start: int) -> Dict[str, List[float]]:
+            async with semaphore:
+                return await self._embed_documents_batch(
+                    ids[start:start + batch_size],
+                    texts[start:start + batch_size]
+                )
+        
+        batch_results = await asyncio.gather(*[
+            run_batch(start) for start in range(0, len(ids), batch_size)
+        ])
+        
+        embeddings = {}
+        for result in batch_results:
+            embeddings.update(result)
+        
+        failed = len(ids) - len(embeddings)
+        if failed:
+            logger.error(f"✗ Embedding failed for {failed}/{len(ids)} items")
+        return embeddings
+    
     
     def create_simple_prompt(self, content: Dict[str, Any]) -> str:   
         # Fixed prompt construction
@@ -120,7 +199,7 @@ class GeminiService:
     
     async def generate_summary(self, content: Dict[str, Any], chunk_idx: int) -> str:
         
-        await self.wait_for_rate_limit()
+        estimated_tokens = self.estimate_tokens(content)
         
         if content['has_images']:
             message_content = [{'type': 'text', 'text': self.create_simple_prompt(content)}]
@@ -139,8 +218,12 @@ class GeminiService:
         max_retries = 2
         for attempt in range(max_retries + 1):
             try:
+                # Every attempt counts against the quota
+                await self.wait_for_rate_limit(estimated_tokens)
+                
                 # Make the API call
                 response = await self.llm.ainvoke(message)
+                await self.rate_limiter.record_success()
                 summary = self.output_parser.parse(response) 
                 # logger.info(f" Generated summary for chunk {chunk_idx + 1}")
                 return summary.content
@@ -152,9 +235,11 @@ class GeminiService:
                 error_msg = str(e).lower()
                                 
                 # Handle specific errors
-                if "rate limit" in error_msg or "quota" in error_msg:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                    logger.warning(f"Rate limited - waiting {wait_time}s before retry {attempt + 1}")
+                if is_rate_limit_error(e):
+                    # Shrinks the shared budget; the limiter paces the retry rather than a long backoff
+                    await self.rate_limiter.record_rate_limited()
+                    wait_time = 1 + random.random()
+                    logger.warning(f"Rate limited - waiting {wait_time:.1f}s before retry {attempt + 1} within the reduced budget")
                     await asyncio.sleep(wait_time)
                 
                 elif "timeout" in error_msg:
@@ -169,76 +254,112 @@ class GeminiService:
         
         # All retries failed - return fallback
         logger.error(f"✗ All retries failed for chunk {chunk_idx + 1}, using fallback")
-        return f"Summary unavailable. Content preview: {content['text'][:900]}..."
+        return f"{SUMMARY_FALLBACK_PREFIX} Content preview: {content['text'][:900]}..."
     
-    async def process_batch(self, batch_chunks: List[Any], start_idx: int) -> List[Dict[str, Any]]:
-        """Process a batch of chunks sequentially."""
-        results = []
+    async def summarize_content(
+        self,
+        content: Dict[str, Any],
+        chunk_idx: int,
+        document_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Summarize already extracted chunk content (see `extract_content`).
+        With a document_id the vector ID is derived from the document, chunk position and content,
+        so processing the same document again overwrites its vectors.
+        """
+        content_hash = chunk_content_hash(content)
+        cache_key = self.chunk_cache.make_key(content_hash, self.cache_version)
         
-        for i, chunk in enumerate(batch_chunks):
-            chunk_idx = start_idx + i
-            
-            # Extract content
-            content = self.extract_content(chunk)
-            
+        # Identical chunks (e.g. boilerplate clauses) reuse an earlier summary and embedding
+        cached = await self.chunk_cache.get(cache_key)
+        if cached:
+            summary, embedding = cached['summary'], cached['embedding']
+        else:
             # Generate summary
             summary = await self.generate_summary(content, chunk_idx)
-            
-            embedding = await self.generate_embedding(summary)
-            
-            # Create result
-            result = {
-                'chunk_id': str(uuid.uuid4()),
-                'summary': summary,
-                'embed_data' : {
-                 'embedding_id': str(uuid.uuid4()),
-                 'embedding' : embedding,    
-                }, 
-                'metadata': {
-                    'raw_text': content['text'],
-                    'tables_html': content['tables'],
-                    'image_base64': content['images'],
-                    'has_tables': content['has_tables'],
-                    'has_images': content['has_images']
-                }
-            }
-            results.append(result)
+            embedding = []
         
-        return results    
+        embedding_id = chunk_vector_id(document_id, chunk_idx, content_hash) if document_id else None
+        return self._build_result(
+            content, chunk_idx, content_hash, cache_key, summary, embedding, bool(cached),
+            embedding_id=embedding_id
+        )
     
- 
-    async def summarize_chunks(self, chunks: List[Any]) -> List[Dict[str, Any]]:
-
-        total_chunks = len(chunks)
-        logger.info(f"Starting to process {total_chunks} chunks in batches of {self.batch_size}")
+    def result_from_checkpoint(self, content: Dict[str, Any], chunk_idx: int, saved: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild a summarized and embedded result saved by an earlier attempt at the same document"""
+        result = self._build_result(
+            content,
+            chunk_idx,
+            saved['content_hash'],
+            saved['cache_key'],
+            saved['summary'],
+            saved['embedding'],
+            cached=False,
+            chunk_id=saved['chunk_id'],
+            embedding_id=saved['embedding_id']
+        )
+        result['resumed'] = True
+        return result
+    
+    def _build_result(
+        self,
+        content: Dict[str, Any],
+        chunk_idx: int,
+        content_hash: str,
+        cache_key: str,
+        summary: str,
+        embedding: List[float],
+        cached: bool,
+        chunk_id: str = None,
+        embedding_id: str = None
+    ) -> Dict[str, Any]:
+        return {
+            'chunk_id': chunk_id or str(uuid.uuid4()),
+            'chunk_index': chunk_idx,
+            'content_hash': content_hash,
+            'cache_key': cache_key,
+            'cached': cached,
+            'resumed': False,
+            'summary': summary,
+            'embed_data' : {
+             'embedding_id': embedding_id or str(uuid.uuid4()),
+             'embedding' : embedding,    
+            }, 
+            'metadata': {
+                'raw_text': content['text'],
+                'tables_html': content['tables'],
+                'image_base64': content['images'],
+                'has_tables': content['has_tables'],
+                'has_images': content['has_images']
+            }
+        }
+    
+    async def embed_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Attach batched embeddings to summarized chunk results in place and cache them.
+        Results already embedded (cache hits) are skipped.
+        Chunks whose embedding failed get no embedding_id so they are stored
+        but never upserted to the vector store.
+        """
+        pending = [result for result in results if not result['embed_data']['embedding']]
+        if not pending:
+            return results
         
-        all_results = []
+        embeddings = await self.generate_embeddings_batch({
+            result['chunk_id']: result['summary'] for result in pending
+        })
         
-        # Process in batches
-        for i in range(0, total_chunks, self.batch_size):
-            batch_chunks = chunks[i:i + self.batch_size]
-            batch_num = (i // self.batch_size) + 1
-            total_batches = (total_chunks + self.batch_size - 1) // self.batch_size
-            
-            logger.info(f"Processing batch {batch_num}/{total_batches}")
-            
-            try:
-                # Process this batch
-                batch_results = await self.process_batch(batch_chunks, i)
-                all_results.extend(batch_results)
-                
-                # Wait between batches (except for the last one)
-                if i + self.batch_size < total_chunks:
-                    # logger.info(f"Batch complete. Waiting {self.batch_delay}s before next batch...")
-                    await asyncio.sleep(self.batch_delay)
-                
-            except Exception as e:
-                logger.error(f"Error processing batch {batch_num}: {e}")
-                raise RAGException("Could not process the file") 
+        for result in pending:
+            embedding = embeddings.get(result['chunk_id'])
+            if embedding:
+                result['embed_data']['embedding'] = embedding
+                if not result['summary'].startswith(SUMMARY_FALLBACK_PREFIX):
+                    await self.chunk_cache.set(result['cache_key'], result['summary'], embedding)
+            else:
+                result['embed_data']['embedding_id'] = None
         
-        logger.info(f"✓ Completed processing all {len(all_results)} chunks")
-        return all_results
- 
+        return results
+    
     async def generate_contract_insights(self, text: str) -> dict:
         prompt = get_contract_analysis_prompt(text)
         try:
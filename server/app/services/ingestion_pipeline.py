@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.checkpoint_service import IngestionCheckpointService
+from app.services.gemini_service import GeminiService
+from app.services.unstructured_service import UnstructuredService
+from app.services.vector_store import document_vector_metadata
+from app.utils.hashing import chunk_content_hash
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+BatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+ChunkFilter = Callable[[int, Any], bool]
+ProgressHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+STAGES = ('parse', 'summarize', 'embed', 'upsert', 'persist')
+
+# Parsed chunks are checkpointed this many at a time
+PARSED_CHECKPOINT_BATCH = 32
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: parsed chunks flow through bounded queues into
+    summarize -> embed -> (vector upsert || chunk persistence) stages, so
+    downstream stages start on the first chunks while later pages are still parsed.
+    """
+
+    def __init__(
+        self,
+        unstructured_service: UnstructuredService,
+        gemini_service: GeminiService,
+        upsert_vectors: BatchHandler,
+        persist_chunks: BatchHandler,
+        chunk_filter: Optional[ChunkFilter] = None,
+        progress: Optional[ProgressHandler] = None,
+        checkpoint: Optional[IngestionCheckpointService] = None,
+        document_id: Optional[str] = None
+    ):
+        self.settings = get_settings()
+        self.unstructured_service = unstructured_service
+        self.gemini_service = gemini_service
+        self.upsert_vectors = upsert_vectors
+        self.persist_chunks = persist_chunks
+        # Called with (chunk index, extracted content); returns False for chunks that should not be
+        # processed (e.g. unchanged since the last version)
+        self.chunk_filter = chunk_filter
+        # Receives a snapshot every `ingestion_progress_interval` seconds while the pipeline runs
+        self.progress = progress
+        # Work completed by earlier attempts at this document is reused, not redone
+        self.checkpoint = checkpoint
+        # Gives chunks deterministic vector IDs, so reprocessing overwrites rather than duplicates
+        self.document_id = document_id
+        self.stats = {
+            'pages_total': 0,
+            'pages_parsed': 0,
+            'chunks_parsed': 0,
+            'chunks_skipped': 0,
+            'chunks_summarized': 0,
+            'chunk_cache_hits': 0,
+            'chunk_cache_misses': 0,
+            'chunks_resumed': 0,
+            'chunks_embedded': 0,
+            'vectors_upserted': 0,
+            'chunks_persisted': 0,
+        }
+        # Seconds each stage spent working (not waiting on its input or on backpressure)
+        self.stage_busy = {stage: 0.0 for stage in STAGES}
+        self.stages_finished = set()
+        self._summarize_workers_running = 0
+        self._start_time = None
+
+    async def run(self, pdf_url: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Run all stages to completion. The first stage failure cancels the others and is re-raised."""
+        queue_size = self.settings.ingestion_queue_size
+        workers = self.gemini_service.max_concurrency
+
+        summarize_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        persist_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        self._start_time = time.monotonic()
+        # The service (and its limiter) may have been used before this run - count only this run's waits
+        rate_limit_wait_before = self.gemini_service.rate_limiter.total_wait_time
+        self._summarize_workers_running = workers
+        if self.checkpoint:
+            await self.checkpoint.load()
+
+        tasks = [
+            asyncio.create_task(self._parse_stage(pdf_url, content_hash, summarize_queue, workers)),
+            *[
+                asyncio.create_task(self._summarize_stage(summarize_queue, embed_queue))
+                for _ in range(workers)
+            ],
+            asyncio.create_task(self._embed_stage(embed_queue, [upsert_queue, persist_queue], workers)),
+            asyncio.create_task(self._write_stage('upsert', upsert_queue, self._upsert_batch)),
+            asyncio.create_task(self._write_stage('persist', persist_queue, self._persist_batch)),
+        ]
+
+        reporter = asyncio.create_task(self._report_progress()) if self.progress else None
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if reporter:
+                reporter.cancel()
+                await asyncio.gather(reporter, return_exceptions=True)
+                await self.progress(self.snapshot())
+
+        elapsed = time.monotonic() - self._start_time
+        self.stats['elapsed_seconds'] = round(elapsed, 2)
+        self.stats['chunks_per_second'] = {
+            stage: round(self.stats[f'chunks_{stage}'] / elapsed, 2) if elapsed > 0 else 0.0
+            for stage in ('summarized', 'embedded')
+        }
+        self.stats['rate_limit_wait_seconds'] = round(
+            self.gemini_service.rate_limiter.total_wait_time - rate_limit_wait_before, 2
+        )
+        stage_busy = {stage: round(busy, 2) for stage, busy in self.stage_busy.items()}
+        logger.info(f"Ingestion pipeline finished: {self.stats}, stage busy seconds: {stage_busy}")
+        return self.stats
+
+    def snapshot(self, state: str = 'running') -> Dict[str, Any]:
+        """Current counters, the earliest unfinished stage and per-stage busy time"""
+        elapsed = time.monotonic() - self._start_time if self._start_time else 0.0
+        return {
+            'state': state,
+            'stage': next((stage for stage in STAGES if stage not in self.stages_finished), 'finalizing'),
+            **self.stats,
+            'elapsed_seconds': round(elapsed, 2),
+            'stages': {
+                stage: {
+                    'busy_seconds': round(self.stage_busy[stage], 2),
+                    'finished': stage in self.stages_finished
+                }
+                for stage in STAGES
+            }
+        }
+
+    async def _report_progress(self):
+        interval = self.settings.ingestion_progress_interval
+        while True:
+            await self.progress(self.snapshot())
+            await asyncio.sleep(interval)
+
+    @contextmanager
+    def _timed(self, stage: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stage_busy[stage] += time.monotonic() - started
+
+    def _on_pages(self, pages_parsed: int, pages_total: int):
+        self.stats['pages_parsed'] = pages_parsed
+        self.stats['pages_total'] = pages_total
+
+    async def _parsed_contents(self, pdf_url: str, content_hash: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Extracted content of each chunk - replayed from the checkpoint when an earlier attempt finished parsing"""
+        if self.checkpoint and self.checkpoint.parse_complete:
+            contents = await self.checkpoint.parsed_contents()
+            self._on_pages(self.checkpoint.pages_total, self.checkpoint.pages_total)
+            for content in contents:
+                yield content
+            return
+
+        if self.checkpoint:
+            await self.checkpoint.reset_parse()
+
+        unsaved, saved_all = [], True
+        async for chunk in self.unstructured_service.stream_chunks(pdf_url, content_hash, on_pages=self._on_pages):
+            content = self.gemini_service.extract_content(chunk)
+            yield content
+            if self.checkpoint:
+                unsaved.append(content)
+                if len(unsaved) >= PARSED_CHECKPOINT_BATCH:
+                    saved_all = await self.checkpoint.save_parsed(unsaved) and saved_all
+                    unsaved = []
+
+        if self.checkpoint:
+            saved_all = await self.checkpoint.save_parsed(unsaved) and saved_all
+            # Replayed only once marked complete - never mark a parse with missing chunks
+            if saved_all:
+                await self.checkpoint.complete_parse(self.stats['pages_total'])
+
+    async def _parse_stage(self, pdf_url: str, content_hash: Optional[str], out_queue: asyncio.Queue, consumers: int):
+        chunk_idx = 0
+        contents = self._parsed_contents(pdf_url, content_hash)
+        try:
+            while True:
+                with self._timed('parse'):
+                    content = await anext(contents, _DONE)
+                if content is _DONE:
+                    break
+
+                if self.chunk_filter is None or self.chunk_filter(chunk_idx, content):
+                    await out_queue.put((chunk_idx, content))
+                else:
+                    self.stats['chunks_skipped'] += 1
+                chunk_idx += 1
+                self.stats['chunks_parsed'] = chunk_idx
+        finally:
+            await contents.aclose()
+
+        self.stages_finished.add('parse')
+        for _ in range(consumers):
+            await out_queue.put(_DONE)
+
+    async def _summarize_stage(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                self._summarize_workers_running -= 1
+                if not self._summarize_workers_running:
+                    self.stages_finished.add('summarize')
+                await out_queue.put(_DONE)
+                return
+
+            chunk_idx, content = item
+            saved = self.checkpoint.results.get(chunk_idx) if self.checkpoint else None
+            if saved and saved['content_hash'] == chunk_content_hash(content):
+                result = self.gemini_service.result_from_checkpoint(content, chunk_idx, saved)
+                self.stats['chunks_resumed'] += 1
+            else:
+                with self._timed('summarize'):
+                    result = await self.gemini_service.summarize_content(content, chunk_idx, self.document_id)
+            self.stats['chunks_summarized'] += 1
+            if result['cached']:
+                self.stats['chunk_cache_hits'] += 1
+            elif not result['resumed'] and self.settings.chunk_cache_enabled:
+                self.stats['chunk_cache_misses'] += 1
+            await out_queue.put(result)
+
+    async def _embed_stage(self, in_queue: asyncio.Queue, out_queues: List[asyncio.Queue], producers: int):
+        """Group summaries into embedding batches, flushing partial batches after `ingestion_flush_interval`."""
+        batch_size = self.settings.gemini_embedding_batch_size
+        flush_interval = self.settings.ingestion_flush_interval
+        finished_producers = 0
+        batch: List[Dict[str, Any]] = []
+
+        async def flush():
+            if not batch:
+                return
+            with self._timed('embed'):
+                results = await self.gemini_service.embed_results(list(batch))
+            batch.clear()
+            if self.checkpoint:
+                await self.checkpoint.save_results(
+                    r for r in results if r['embed_data']['embedding'] and not r['resumed']
+                )
+            self.stats['chunks_embedded'] += sum(1 for r in results if r['embed_data']['embedding'])
+            for queue in out_queues:
+                await queue.put(results)
+
+        while finished_producers < producers:
+            if batch:
+                # Don't hold a partial batch back for long while summaries trickle in
+                try:
+                    item = await asyncio.wait_for(in_queue.get(), timeout=flush_interval)
+                except asyncio.TimeoutError:
+                    await flush()
+                    continue
+            else:
+                item = await in_queue.get()
+
+            if item is _DONE:
+                finished_producers += 1
+                continue
+
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await flush()
+
+        await flush()
+        self.stages_finished.add('embed')
+        for queue in out_queues:
+            await queue.put(_DONE)
+
+    async def _write_stage(self, stage: str, in_queue: asyncio.Queue, handler: BatchHandler):
+        while True:
+            results = await in_queue.get()
+            if results is _DONE:
+                self.stages_finished.add(stage)
+                return
+            with self._timed(stage):
+                await handler(results)
+
+    async def _upsert_batch(self, results: List[Dict[str, Any]]):
+        vectors = [
+            {
+                "embedding_id": result['embed_data']['embedding_id'],
+                "embedding": result['embed_data']['embedding'],
+                "metadata": document_vector_metadata(self.document_id) if self.document_id else None
+            }
+            for result in results
+            if result['embed_data']['embedding']
+            # Already in the index from an earlier attempt
+            and not (self.checkpoint and result['embed_data']['embedding_id'] in self.checkpoint.upserted)
+        ]
+        if not vectors:
+            return
+
+        response = await self.upsert_vectors(vectors)
+        self.stats['vectors_upserted'] += response['upserted_count']
+        if self.checkpoint:
+            await self.checkpoint.save_upserted([vector['embedding_id'] for vector in vectors])
+
+    async def _persist_batch(self, results: List[Dict[str, Any]]):
+        await self.persist_chunks(results)
+        self.stats['chunks_persisted'] += len(results)
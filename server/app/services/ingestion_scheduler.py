@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from app.celery_app import celery_app
+from app.core.config import get_settings
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionScheduler:
+    """
+    Tenant-aware dispatch of ingestion tasks to Celery.
+
+    Jobs wait in per-user FIFO lists in Redis and are handed to Celery round-robin across users,
+    least recently served first, never exceeding a user's concurrency cap. A user with hundreds
+    of uploads therefore holds at most `cap` slots in the Celery queue, and everyone else's
+    documents interleave with theirs. Documents up to `ingestion_priority_max_bytes` go through a
+    separate priority lane (its own Celery queue and caps) so small uploads don't wait behind
+    large ones. Slots are released from the worker when a task finishes (not on retries),
+    and expire after `ingestion_slot_ttl` in case a worker dies mid-task. Besides submit and
+    release, `dispatch_ingestion` runs `reclaim_expired` + `dispatch` periodically, so jobs left
+    queued by an expired slot or a failed send/release still go out.
+    """
+
+    PRIORITY_LANE = 'priority'
+    DEFAULT_LANE = 'default'
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.prefix = f"{self.settings.redis_prefix}ingestion:"
+        self.lock_key = f"{self.prefix}dispatch_lock"
+        self.queues = {
+            self.PRIORITY_LANE: self.settings.ingestion_priority_queue,
+            self.DEFAULT_LANE: self.settings.ingestion_default_queue,
+        }
+
+    def _users_key(self, lane: str) -> str:
+        # Users with pending jobs, scored by when they were last served
+        return f"{self.prefix}{lane}:users"
+
+    def _pending_key(self, lane: str, user_id: str) -> str:
+        return f"{self.prefix}{lane}:pending:{user_id}"
+
+    def _running_key(self, lane: str, user_id: str) -> str:
+        # Task ids holding a slot, scored by slot expiry
+        return f"{self.prefix}{lane}:running:{user_id}"
+
+    def _job_key(self, task_id: str) -> str:
+        return f"{self.prefix}job:{task_id}"
+
+    def lane_for(self, file_size: Optional[int]) -> str:
+        if file_size is not None and file_size <= self.settings.ingestion_priority_max_bytes:
+            return self.PRIORITY_LANE
+        return self.DEFAULT_LANE
+
+    def concurrency_cap(self, user_id: str, lane: str) -> int:
+        """Per-tenant override if configured, else the lane default"""
+        override = self.settings.ingestion_user_concurrency_overrides.get(user_id)
+        if override is not None:
+            return override
+        if lane == self.PRIORITY_LANE:
+            return self.settings.ingestion_priority_user_concurrency
+        return self.settings.ingestion_user_concurrency
+
+    async def submit(
+        self,
+        task_name: str,
+        args: List[Any],
+        user_id: str,
+        file_size: Optional[int] = None
+    ) -> str:
+        """Queue an ingestion task for a user and dispatch whatever fits. Returns the Celery task id."""
+        lane = self.lane_for(file_size)
+        job = {'task_id': str(uuid.uuid4()), 'task_name': task_name, 'args': args}
+
+        try:
+            redis = redis_client.redis
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(self._pending_key(lane, user_id), json.dumps(job))
+                # New users start ahead of everyone already served
+                pipe.zadd(self._users_key(lane), {user_id: 0}, nx=True)
+                await pipe.execute()
+        except Exception as e:
+            # Scheduling is an optimization - never lose the document over it
+            logger.error(f"Ingestion scheduler unavailable, sending {task_name} directly: {str(e)}")
+            await self._send(job, lane)
+            return job['task_id']
+
+        try:
+            await self.dispatch()
+        except Exception as e:
+            # The job stays queued and goes out with the next dispatch
+            logger.error(f"Failed to dispatch ingestion tasks: {str(e)}")
+
+        return job['task_id']
+
+    async def dispatch(self) -> int:
+        """Hand pending jobs to Celery while users have free slots. Returns the number dispatched."""
+        redis = redis_client.redis
+        dispatched = 0
+
+        async with redis.lock(self.lock_key, timeout=30, blocking_timeout=10):
+            for lane in (self.PRIORITY_LANE, self.DEFAULT_LANE):
+                users = await redis.zrange(self._users_key(lane), 0, -1)
+
+                # One job per user per pass until nobody can take more
+                while users:
+                    for user_id in list(users):
+                        if await self._running_count(lane, user_id) >= self.concurrency_cap(user_id, lane):
+                            users.remove(user_id)
+                            continue
+
+                        raw_job = await redis.lpop(self._pending_key(lane, user_id))
+                        if raw_job is None:
+                            await redis.zrem(self._users_key(lane), user_id)
+                            users.remove(user_id)
+                            continue
+
+                        await self._start(json.loads(raw_job), lane, user_id)
+                        dispatched += 1
+
+        if dispatched:
+            logger.info(f"Dispatched {dispatched} ingestion tasks")
+        return dispatched
+
+    async def release(self, task_id: str) -> None:
+        """Free the slot held by a finished task and dispatch the next jobs"""
+        try:
+            redis = redis_client.redis
+            job = await redis.hgetall(self._job_key(task_id))
+            if not job:
+                return
+
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(self._running_key(job['lane'], job['user_id']), task_id)
+                pipe.delete(self._job_key(task_id))
+                await pipe.execute()
+
+            await self.dispatch()
+        except Exception as e:
+            logger.error(f"Failed to release ingestion slot of task {task_id}: {str(e)}")
+
+    async def reclaim_expired(self) -> int:
+        """Drop slots whose expiry passed (worker died or release failed). Returns the number reclaimed."""
+        redis = redis_client.redis
+        now = time.time()
+        reclaimed = 0
+
+        for lane in (self.PRIORITY_LANE, self.DEFAULT_LANE):
+            async for running_key in redis.scan_iter(match=self._running_key(lane, '*')):
+                expired = await redis.zrangebyscore(running_key, '-inf', now)
+                if not expired:
+                    continue
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.zrem(running_key, *expired)
+                    pipe.delete(*[self._job_key(task_id) for task_id in expired])
+                    await pipe.execute()
+                reclaimed += len(expired)
+
+        if reclaimed:
+            logger.warning(f"Reclaimed {reclaimed} expired ingestion slots")
+        return reclaimed
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Pending and running job counts per lane and user"""
+        redis = redis_client.redis
+        stats: Dict[str, Any] = {}
+        for lane in (self.PRIORITY_LANE, self.DEFAULT_LANE):
+            users = await redis.zrange(self._users_key(lane), 0, -1)
+            stats[lane] = {
+                user_id: {
+                    'pending': await redis.llen(self._pending_key(lane, user_id)),
+                    'running': await self._running_count(lane, user_id),
+                }
+                for user_id in users
+            }
+        return stats
+
+    async def _running_count(self, lane: str, user_id: str) -> int:
+        redis = redis_client.redis
+        running_key = self._running_key(lane, user_id)
+        # Slots of tasks whose worker died expire on their own
+        await redis.zremrangebyscore(running_key, '-inf', time.time())
+        return await redis.zcard(running_key)
+
+    async def _start(self, job: Dict[str, Any], lane: str, user_id: str) -> None:
+        redis = redis_client.redis
+        slot_ttl = self.settings.ingestion_slot_ttl
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._running_key(lane, user_id), {job['task_id']: time.time() + slot_ttl})
+            pipe.hset(self._job_key(job['task_id']), mapping={'lane': lane, 'user_id': user_id})
+            pipe.expire(self._job_key(job['task_id']), slot_ttl)
+            # Served users go to the back of the round-robin
+            pipe.zadd(self._users_key(lane), {user_id: time.time()})
+            await pipe.execute()
+
+        try:
+            await self._send(job, lane)
+        except Exception:
+            # Give the slot back and keep the job at the head of the user's queue
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(self._running_key(lane, user_id), job['task_id'])
+                pipe.delete(self._job_key(job['task_id']))
+                pipe.lpush(self._pending_key(lane, user_id), json.dumps(job))
+                await pipe.execute()
+            raise
+
+    async def _send(self, job: Dict[str, Any], lane: str) -> None:
+        # Publishing to the broker is blocking I/O
+        await asyncio.to_thread(
+            celery_app.send_task,
+            job['task_name'],
+            args=job['args'],
+            task_id=job['task_id'],
+            queue=self.queues[lane]
+        )
+
+
+ingestion_scheduler = IngestionScheduler()
@@ -0,0 +1,503 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import get_settings
+from app.core.exceptions import VectorStoreError
+
+logger = logging.getLogger(__name__)
+
+# Log record frame: header length, payload length (little-endian uint32), then the JSON header and float32 rows
+_RECORD_FRAME = struct.Struct("<II")
+
+# The log is folded into a new snapshot once it outgrows the snapshot and this many bytes
+_COMPACT_MIN_BYTES = 8 * 1024 * 1024
+
+
+class _NamespaceIndex:
+    """
+    Vectors of one namespace: an L2-normalized float32 matrix with spare capacity for appends.
+    Rows below `count` are never changed in place - overwrites and deletes go to a copy - so
+    readers can search whatever index object they picked up while a writer thread works.
+    """
+
+    def __init__(self, dimension: int, capacity: int = 0):
+        self.matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+        self.count = 0
+        self._columns: Dict[str, Tuple[int, np.ndarray]] = {}
+
+    def copy(self) -> "_NamespaceIndex":
+        index = _NamespaceIndex(self.matrix.shape[1], self.matrix.shape[0])
+        index.matrix[:self.count] = self.matrix[:self.count]
+        index.ids = list(self.ids)
+        index.metadata = list(self.metadata)
+        index.positions = dict(self.positions)
+        index.count = self.count
+        return index
+
+    def append(self, ids: List[str], rows: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        needed = self.count + len(ids)
+        if needed > self.matrix.shape[0]:
+            grown = np.zeros((max(needed, 2 * self.matrix.shape[0], 64), self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.matrix[:self.count]
+            self.matrix = grown
+        self.matrix[self.count:needed] = rows
+        for offset, vector_id in enumerate(ids):
+            self.positions[vector_id] = self.count + offset
+        self.ids.extend(ids)
+        self.metadata.extend(metadata)
+        # Last, so a reader never sees a count ahead of its rows
+        self.count = needed
+
+    def without(self, positions: set) -> "_NamespaceIndex":
+        keep = [position for position in range(self.count) if position not in positions]
+        index = _NamespaceIndex(self.matrix.shape[1])
+        index.append(
+            [self.ids[position] for position in keep],
+            self.matrix[keep],
+            [self.metadata[position] for position in keep]
+        )
+        return index
+
+    def column(self, field: str, count: int) -> np.ndarray:
+        """Metadata field of the first `count` vectors as an array, cached until more are appended"""
+        cached = self._columns.get(field)
+        if cached is None or cached[0] != count:
+            values = np.empty(count, dtype=object)
+            values[:] = [metadata.get(field) for metadata in self.metadata[:count]]
+            cached = (count, values)
+            self._columns[field] = cached
+        return cached[1]
+
+    def filter_mask(self, filter: Dict[str, Any], count: int) -> np.ndarray:
+        """Subset of Pinecone's metadata filter language: equality, $eq, $ne, $in, $nin and $and"""
+        mask = np.ones(count, dtype=bool)
+        for field, condition in filter.items():
+            if field == "$and":
+                for sub_filter in condition:
+                    mask &= self.filter_mask(sub_filter, count)
+                continue
+
+            values = self.column(field, count)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+
+            for operator, operand in condition.items():
+                if operator == "$eq":
+                    mask &= values == operand
+                elif operator == "$ne":
+                    mask &= values != operand
+                elif operator in ("$in", "$nin"):
+                    found = np.fromiter((value in operand for value in values), dtype=bool, count=count)
+                    mask &= found if operator == "$in" else ~found
+        return mask
+
+
+class LocalVectorStore:
+    """
+    In-process vector store: one L2-normalized float32 NumPy matrix per namespace, searched by
+    exact cosine similarity, persisted to `vector_store_local_dir`. Writes are appended to a log
+    next to the last snapshot (folded into a new snapshot once it outgrows it), so a write costs
+    the size of the batch, not of the store. Worker and API processes share the directory -
+    writers serialize on a file lock, readers apply whatever was appended since they last looked.
+    IDs are unique across namespaces: upserting an ID into another namespace moves it there.
+    Meant for small deployments, tests and offline benchmarks.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.directory = Path(self.settings.vector_store_local_dir)
+        self.path = self.directory / "vectors.npz"
+        self.lock_path = self.directory / "vectors.lock"
+
+        self._indexes: Dict[str, _NamespaceIndex] = {}
+        self._namespace_of: Dict[str, str] = {}
+        self._dimension = 0
+        self._generation = 0
+        self._log_offset = 0
+        self._loaded_version: Optional[Tuple[int, int]] = None
+        self._connected = False
+        self._lock = threading.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+        return False
+
+    async def connect(self):
+        try:
+            await asyncio.to_thread(self._connect_sync)
+            self._connected = True
+            logger.info(f"Opened local vector store at {self.path} ({len(self._namespace_of)} vectors)")
+        except Exception as e:
+            logger.error(f"Failed to open local vector store: {str(e)}")
+            raise VectorStoreError("connect", str(e))
+
+    async def ensure_connected(self):
+        if not self._connected:
+            await self.connect()
+
+    async def disconnect(self):
+        # Every write is already on disk
+        self._connected = False
+        logger.info("Closed local vector store")
+
+    async def upsert_embeddings(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Insert or overwrite vectors by ID. Returns the same shape as PineconeService.upsert_embeddings."""
+        await self.ensure_connected()
+        start_time = time.monotonic()
+        try:
+            upserted_count = await asyncio.to_thread(self._upsert_sync, vectors, namespace or "")
+        except Exception as e:
+            logger.error(f"Local vector store upsert failed: {str(e)}")
+            raise VectorStoreError("upsert", str(e))
+
+        return {
+            "upserted_count": upserted_count,
+            "batches": [{
+                "batch": 1,
+                "count": upserted_count,
+                "attempts": 1,
+                "elapsed_ms": int((time.monotonic() - start_time) * 1000)
+            }]
+        }
+
+    async def query_similar(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        namespace: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Exact top-k by cosine similarity within a namespace, optionally restricted by a metadata filter"""
+        await self.ensure_connected()
+        try:
+            await self._refresh()
+            # Searches one namespace's matrix - small enough to run inline, a thread hop would cost more
+            return self._query_sync(query_vector, top_k, filter, namespace or "", include_metadata, include_values)
+        except Exception as e:
+            logger.error(f"Local vector store query failed: {str(e)}")
+            raise VectorStoreError("query", str(e))
+
+    async def fetch_vectors(
+        self,
+        ids: List[str],
+        batch_size: int = 100,
+        namespace: Optional[str] = None
+    ) -> Dict[str, List[float]]:
+        """Fetch (normalized) vector values by IDs. IDs not in the namespace are left out."""
+        await self.ensure_connected()
+        await self._refresh()
+        index = self._indexes.get(namespace or "")
+        if index is None:
+            return {}
+        count = index.count
+        matrix, positions = index.matrix, index.positions
+        return {
+            vector_id: matrix[positions[vector_id]].tolist()
+            for vector_id in ids
+            if positions.get(vector_id, count) < count
+        }
+
+    async def delete_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        await self.ensure_connected()
+        try:
+            deleted_count = await asyncio.to_thread(self._delete_sync, ids, namespace or "")
+        except Exception as e:
+            logger.error(f"Local vector store delete failed: {str(e)}")
+            raise VectorStoreError("delete", str(e))
+
+        logger.info(f"Deleted {deleted_count} vectors from the local vector store")
+        return {"deleted_count": deleted_count}
+
+    def _connect_sync(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._reload_if_changed()
+
+    async def _refresh(self):
+        # Checking is two stat calls; loading what changed happens off the event loop
+        if self._disk_version() != (self._loaded_version, self._log_offset):
+            await asyncio.to_thread(self._refresh_sync)
+
+    def _refresh_sync(self):
+        with self._lock:
+            self._reload_if_changed()
+
+    def _log_path(self, generation: int) -> Path:
+        return self.directory / f"vectors.{generation}.log"
+
+    def _disk_version(self) -> Tuple[Optional[Tuple[int, int]], int]:
+        try:
+            stat = self.path.stat()
+            snapshot = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            log_size = self._log_path(self._generation).stat().st_size
+        except FileNotFoundError:
+            log_size = 0
+        return snapshot, log_size
+
+    @contextmanager
+    def _write_lock(self):
+        # Threads of this process, then other processes sharing the directory
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload_if_changed()
+                log_path = self._log_path(self._generation)
+                if log_path.exists() and log_path.stat().st_size > self._log_offset:
+                    # Torn record of a writer that died mid-append - nobody else is writing now
+                    os.truncate(log_path, self._log_offset)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload_if_changed(self):
+        try:
+            stat = self.path.stat()
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+
+        if version != self._loaded_version:
+            # Compaction renames a new snapshot into place, so the inode changes even when mtime granularity is coarse
+            self._load_snapshot(version)
+        self._replay_log()
+
+    def _load_snapshot(self, version: Optional[Tuple[int, int]]):
+        ids, metadata, namespaces, generation = [], [], [], 0
+        matrix = np.zeros((0, 0), dtype=np.float32)
+        if version is not None:
+            with np.load(self.path, allow_pickle=False) as data:
+                ids = data["ids"].tolist()
+                matrix = data["vectors"]
+                metadata = [json.loads(item) for item in data["metadata"].tolist()]
+                # Files written before namespaces keep everything in the default namespace
+                namespaces = data["namespaces"].tolist() if "namespaces" in data.files else [""] * len(ids)
+                generation = int(data["generation"]) if "generation" in data.files else 0
+
+        dimension = matrix.shape[1] if matrix.size else 0
+        by_namespace: Dict[str, List[int]] = {}
+        for position, namespace in enumerate(namespaces):
+            by_namespace.setdefault(namespace, []).append(position)
+
+        indexes: Dict[str, _NamespaceIndex] = {}
+        for namespace, positions in by_namespace.items():
+            index = _NamespaceIndex(dimension)
+            index.append([ids[p] for p in positions], matrix[positions], [metadata[p] for p in positions])
+            indexes[namespace] = index
+
+        # Swapped in whole - queries on the event loop never see a half-loaded store
+        self._indexes = indexes
+        self._namespace_of = dict(zip(ids, namespaces))
+        self._dimension = dimension
+        self._generation = generation
+        self._log_offset = 0
+        self._loaded_version = version
+
+    def _replay_log(self):
+        """Apply records appended since the last look. A partial record at the end is left for next time."""
+        try:
+            with open(self._log_path(self._generation), "rb") as log_file:
+                log_file.seek(self._log_offset)
+                data = log_file.read()
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        while len(data) - offset >= _RECORD_FRAME.size:
+            header_size, payload_size = _RECORD_FRAME.unpack_from(data, offset)
+            end = offset + _RECORD_FRAME.size + header_size + payload_size
+            if end > len(data):
+                break
+            header = json.loads(data[offset + _RECORD_FRAME.size:offset + _RECORD_FRAME.size + header_size])
+            if header["op"] == "upsert":
+                rows = np.frombuffer(
+                    data, dtype=np.float32, count=payload_size // 4, offset=end - payload_size
+                ).reshape(len(header["ids"]), -1)
+                self._apply_upsert(header["namespace"], header["ids"], rows, header["metadata"])
+            else:
+                self._apply_delete(header["namespace"], header["ids"])
+            offset = end
+        self._log_offset += offset
+
+    def _append_log(self, header: Dict[str, Any], payload: bytes = b""):
+        encoded = json.dumps(header).encode()
+        record = _RECORD_FRAME.pack(len(encoded), len(payload)) + encoded + payload
+        # One write per record - readers never apply a record they didn't get whole
+        with open(self._log_path(self._generation), "ab") as log_file:
+            log_file.write(record)
+        self._log_offset += len(record)
+
+        snapshot_size = self.path.stat().st_size if self.path.exists() else 0
+        if self._log_offset > max(snapshot_size, _COMPACT_MIN_BYTES):
+            self._compact()
+
+    def _compact(self):
+        """Fold the log into a new snapshot generation"""
+        ids, rows, metadata, namespaces = [], [], [], []
+        for namespace, index in self._indexes.items():
+            ids.extend(index.ids[:index.count])
+            rows.append(index.matrix[:index.count])
+            metadata.extend(index.metadata[:index.count])
+            namespaces.extend([namespace] * index.count)
+
+        previous_log = self._log_path(self._generation)
+        generation = self._generation + 1
+        # Write then rename, so readers never see a partial file
+        tmp_path = self.directory / f"vectors.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array(ids, dtype=str),
+            vectors=np.vstack(rows) if rows else np.zeros((0, self._dimension), dtype=np.float32),
+            metadata=np.array([json.dumps(item) for item in metadata], dtype=str),
+            namespaces=np.array(namespaces, dtype=str),
+            generation=np.array(generation)
+        )
+        self._log_path(generation).touch()
+        os.replace(tmp_path, self.path)
+        previous_log.unlink(missing_ok=True)
+
+        stat = self.path.stat()
+        self._loaded_version = (stat.st_ino, stat.st_mtime_ns)
+        self._generation = generation
+        self._log_offset = 0
+        logger.info(f"Compacted local vector store into generation {generation} ({len(ids)} vectors)")
+
+    @staticmethod
+    def _normalize(values: List[float]) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _apply_upsert(self, namespace: str, ids: List[str], rows: np.ndarray, metadata: List[Dict[str, Any]]):
+        if not self._dimension:
+            self._dimension = rows.shape[1]
+
+        # Last write wins within the batch
+        latest = {vector_id: position for position, vector_id in enumerate(ids)}
+        moved: Dict[str, List[str]] = {}
+        overwrites, appends = [], []
+        for vector_id, position in latest.items():
+            current = self._namespace_of.get(vector_id)
+            if current == namespace:
+                overwrites.append((vector_id, position))
+            else:
+                if current is not None:
+                    moved.setdefault(current, []).append(vector_id)
+                appends.append(position)
+
+        for other_namespace, moved_ids in moved.items():
+            self._apply_delete(other_namespace, moved_ids)
+
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = _NamespaceIndex(self._dimension)
+        elif overwrites:
+            # Copy on write - concurrent queries keep searching the previous rows
+            index = index.copy()
+        for vector_id, position in overwrites:
+            index.matrix[index.positions[vector_id]] = rows[position]
+            index.metadata[index.positions[vector_id]] = metadata[position]
+        if appends:
+            index.append([ids[p] for p in appends], rows[appends], [metadata[p] for p in appends])
+        self._indexes[namespace] = index
+        self._namespace_of.update((ids[p], namespace) for p in appends)
+
+    def _apply_delete(self, namespace: str, ids: List[str]) -> int:
+        index = self._indexes.get(namespace)
+        if index is None:
+            return 0
+        doomed = {index.positions[vector_id] for vector_id in ids if vector_id in index.positions}
+        if not doomed:
+            return 0
+
+        for position in doomed:
+            del self._namespace_of[index.ids[position]]
+        self._indexes[namespace] = index.without(doomed)
+        return len(doomed)
+
+    def _upsert_sync(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        if not vectors:
+            return 0
+        with self._write_lock():
+            rows = np.stack([self._normalize(vector["embedding"]) for vector in vectors])
+            dimension = self._dimension or rows.shape[1]
+            if rows.shape[1] != dimension:
+                raise ValueError(f"Vectors have dimension {rows.shape[1]}, expected {dimension}")
+
+            ids = [vector["embedding_id"] for vector in vectors]
+            metadata = [vector.get("metadata") or {} for vector in vectors]
+            self._apply_upsert(namespace, ids, rows, metadata)
+            self._append_log(
+                {"op": "upsert", "namespace": namespace, "ids": ids, "metadata": metadata},
+                rows.astype(np.float32).tobytes()
+            )
+            return len(vectors)
+
+    def _delete_sync(self, ids: List[str], namespace: str) -> int:
+        with self._write_lock():
+            deleted_count = self._apply_delete(namespace, ids)
+            if deleted_count:
+                self._append_log({"op": "delete", "namespace": namespace, "ids": ids})
+            return deleted_count
+
+    def _query_sync(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]],
+        namespace: str,
+        include_metadata: bool = False,
+        include_values: bool = False
+    ) -> List[Dict[str, Any]]:
+        index = self._indexes.get(namespace)
+        if index is None or top_k <= 0:
+            return []
+        # Count first - rows below it are complete whatever a writer does next
+        count = index.count
+        matrix, ids, metadata = index.matrix[:count], index.ids, index.metadata
+        if not count:
+            return []
+
+        candidates = np.flatnonzero(index.filter_mask(filter, count)) if filter else np.arange(count)
+        if not candidates.size:
+            return []
+
+        scores = matrix[candidates] @ self._normalize(query_vector)
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for position in top:
+            row = candidates[position]
+            match = {"id": ids[row], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = metadata[row]
+            if include_values:
+                match["values"] = matrix[row].tolist()
+            matches.append(match)
+        return matches
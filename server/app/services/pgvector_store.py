@@ -0,0 +1,129 @@
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import VectorStoreError
+from app.repositories.document_repository import DocumentChunkRepository
+from app.repositories.query_repository import QueryRepository
+
+logger = logging.getLogger(__name__)
+
+
+class PgVectorStore:
+    """
+    Vectors kept in Postgres, on document_chunks.embedding (pgvector, HNSW index).
+
+    Ingestion writes embeddings together with their chunk rows (insert_bulk(..., embeddings=...)),
+    inside the task's transaction, so `upsert_embeddings` has nothing left to do - a chunk and its
+    vector are committed or rolled back together. Queries that need summaries should call
+    QueryRepository.search_similar_chunks directly; `query_similar` is here for the protocol.
+    Namespaces are accepted and ignored - rows are already scoped by their document_id column.
+    """
+
+    def __init__(self):
+        self.chunk_repo = DocumentChunkRepository()
+        self.query_repo = QueryRepository()
+        self._connected = False
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+        return False
+
+    async def connect(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                column = await db.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'document_chunks' AND column_name = 'embedding'"
+                ))
+                if column.scalar() is None:
+                    raise RuntimeError("document_chunks.embedding is missing - install pgvector and run the migrations")
+            self._connected = True
+            logger.info("Connected to pgvector store")
+        except Exception as e:
+            logger.error(f"Failed to connect to pgvector store: {str(e)}")
+            raise VectorStoreError("connect", str(e))
+
+    async def ensure_connected(self):
+        if not self._connected:
+            await self.connect()
+
+    async def disconnect(self):
+        # Sessions come from the shared engine's pool
+        self._connected = False
+        logger.info("Disconnected from pgvector store")
+
+    async def upsert_embeddings(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """No-op: embeddings are written with the chunk rows, in the same transaction"""
+        return {
+            "upserted_count": len(vectors),
+            "batches": [{"batch": 1, "count": len(vectors), "attempts": 0, "elapsed_ms": 0}]
+        }
+
+    async def query_similar(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        namespace: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k chunks by cosine similarity. Only filters on document_id."""
+        document_id = None
+        for field, condition in (filter or {}).items():
+            if isinstance(condition, dict) and set(condition) == {"$eq"}:
+                condition = condition["$eq"]
+            if field != "document_id" or isinstance(condition, dict):
+                raise VectorStoreError("query", f"Unsupported pgvector filter on {field}")
+            document_id = condition
+
+        async with AsyncSessionLocal() as db:
+            try:
+                chunks = await self.query_repo.search_similar_chunks(
+                    query_vector, top_k, db, document_id=document_id, include_embeddings=include_values
+                )
+            except Exception as e:
+                raise VectorStoreError("query", str(e))
+
+        matches = []
+        for chunk in chunks:
+            match = {"id": chunk.embedding_id, "score": chunk.score}
+            if include_values:
+                match["values"] = chunk.embedding
+            matches.append(match)
+        return matches
+
+    async def fetch_vectors(
+        self,
+        ids: List[str],
+        batch_size: int = 100,
+        namespace: Optional[str] = None
+    ) -> Dict[str, List[float]]:
+        """Fetch vector values by IDs. IDs without a stored embedding are left out."""
+        async with AsyncSessionLocal() as db:
+            try:
+                return await self.chunk_repo.get_embeddings(ids, db)
+            except Exception as e:
+                raise VectorStoreError("fetch", str(e))
+
+    async def delete_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        # Deleting a chunk row deletes its embedding; this only covers rows that outlive their vector
+        async with AsyncSessionLocal() as db:
+            try:
+                deleted_count = await self.chunk_repo.clear_embeddings(ids, db)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                raise VectorStoreError("delete", str(e))
+
+        logger.info(f"Cleared {deleted_count} embeddings from document_chunks")
+        return {"deleted_count": deleted_count}
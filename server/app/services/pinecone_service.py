@@ -1,40 +1,65 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from pinecone import PineconeAsyncio, ServerlessSpec
+import aiohttp
+import asyncio
+import json
 import logging
+import time
 from server.app.core.config import Settings
 from app.core.exceptions import VectorStoreError
 
 logger = logging.getLogger(__name__)
 
+
+def is_connection_error(error: Exception) -> bool:
+    """Transport failures a fresh connection can fix - API errors (4xx/5xx responses) are not"""
+    return isinstance(error, (
+        aiohttp.ClientConnectionError,
+        aiohttp.ClientPayloadError,
+        asyncio.TimeoutError,
+        ConnectionError,
+    ))
+
+
 class PineconeService:
     def __init__(self):
         self.settings = Settings()
         self._client = None
         self._index = None
         self._index_host = None
+        self._reconnect_lock = asyncio.Lock()
     
     async def __aenter__(self):
         """Async context manager entry"""
         await self.connect()
         return self
     
-    async def __aexit__(self):
+    async def __aexit__(self, exc_type, exc, tb):
         """Async context manager exit"""
         await self.disconnect()
         return False
     
     async def connect(self):
         """Connect to Pinecone using async context manager pattern"""
+        if self.settings.pinecone_skip_control_plane and not (self._index_host or self.settings.pinecone_index_host):
+            # describe_index is a control-plane call too - skipping it needs the host up front
+            raise VectorStoreError("pinecone_skip_control_plane requires pinecone_index_host to be set")
+        
         try:
             # Use async context manager for PineconeAsyncio
             self._client = PineconeAsyncio(api_key=self.settings.pinecone_api_key)
             
-            # Ensure index exists
-            await self._ensure_index()
+            if not self._index_host:
+                self._index_host = self.settings.pinecone_index_host
             
-            # Get the index host URL
-            index_description = await self._client.describe_index(self.settings.pinecone_index_name)
-            self._index_host = index_description.host
+            # Control-plane calls only happen until the index host is known
+            if not self._index_host:
+                # Ensure index exists
+                await self._ensure_index()
+                
+                # Get the index host URL
+                index_description = await self._client.describe_index(self.settings.pinecone_index_name)
+                self._index_host = index_description.host
             
             # Create async index connection using host
             self._index = self._client.IndexAsyncio(host=self._index_host)
@@ -47,20 +72,45 @@ class PineconeService:
             await self._cleanup()
             raise VectorStoreError(f"Failed to connect to vector store: {str(e)}")     
     
+    async def ensure_connected(self):
+        """Connect if not already connected"""
+        if not self._index:
+            await self.connect()
+    
     async def disconnect(self):
         """Close Pinecone connection"""
         await self._cleanup()
         logger.info("Disconnected from Pinecone")    
     
     async def _cleanup(self):
-        """Internal cleanup method"""
+        """Internal cleanup method. The resolved index host stays cached for reconnects."""
         if self._index:
             # IndexAsyncio doesn't have a close method, just set to None
             self._index = None
         if self._client:
-            await self._client.close()
+            try:
+                await self._client.close()
+            except Exception as e:
+                logger.warning(f"Error closing Pinecone client: {str(e)}")
             self._client = None
-        self._index_host = None
+    
+    async def _call_with_reconnect(self, operation: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a data-plane call, reconnecting once if the connection failed"""
+        await self.ensure_connected()
+        index = self._index
+        try:
+            return await call()
+        except Exception as e:
+            # A rejected request would be rejected again - only a broken connection is worth replacing
+            if not is_connection_error(e):
+                raise
+            logger.warning(f"Pinecone {operation} failed, reconnecting: {str(e)}")
+            async with self._reconnect_lock:
+                # Concurrent callers share one reconnect
+                if self._index is index:
+                    await self._cleanup()
+                    await self.connect()
+            return await call()
             
     async def _ensure_index(self):
         """Ensure the Pinecone index exists"""
@@ -90,26 +140,96 @@ class PineconeService:
             logger.error(f"Error ensuring Pinecone index: {str(e)}")
             raise VectorStoreError(f"Failed to ensure index exists: {str(e)}")       
     
-    async def upsert_embeddings(self, vectors: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Upsert embeddings to Pinecone"""
-        if not self._index:
-            raise VectorStoreError("Vector store not connected")
+    def _split_upsert_batches(self, vectors: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split vectors into batches bounded by both vector count and estimated request size"""
+        max_count = self.settings.pinecone_upsert_batch_size
+        max_bytes = self.settings.pinecone_upsert_max_bytes
+        
+        batches = []
+        batch, batch_bytes = [], 0
+        for vector in vectors:
+            vector_bytes = len(json.dumps(vector))
+            if batch and (len(batch) >= max_count or batch_bytes + vector_bytes > max_bytes):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += vector_bytes
         
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def _upsert_batch(
+        self,
+        batch_num: int,
+        batch: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Upsert one batch, retrying it on its own with exponential backoff"""
+        max_retries = self.settings.pinecone_upsert_max_retries
+        start_time = time.monotonic()
+        
+        for attempt in range(max_retries + 1):
+            try:
+                result = await self._call_with_reconnect(
+                    "upsert",
+                    lambda: self._index.upsert(vectors=batch, namespace=namespace)
+                )
+                return {
+                    "batch": batch_num,
+                    "count": result.upserted_count,
+                    "attempts": attempt + 1,
+                    "elapsed_ms": int((time.monotonic() - start_time) * 1000)
+                }
+            except Exception as e:
+                if attempt >= max_retries:
+                    raise
+                wait_time = 2 ** attempt
+                logger.warning(
+                    f"Upsert batch {batch_num} failed (attempt {attempt + 1}/{max_retries + 1}), "
+                    f"retrying in {wait_time}s: {str(e)}"
+                )
+                await asyncio.sleep(wait_time)
+    
+    async def upsert_embeddings(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Upsert embeddings (with their metadata, if any) into a namespace, in size-bounded batches
+        sent with bounded concurrency. Returns the total upserted count and per-batch counts and timings.
+        """
         try:
             # Prepare vectors for upsert
-            all_vectors = [
-                {
+            all_vectors = []
+            for vec in vectors:
+                vector = {
                     "id": vec["embedding_id"],
                     "values": vec["embedding"]
                 }
-                for vec in vectors
-            ]
-          
-            result = await self._index.upsert(vectors=all_vectors)
+                if vec.get("metadata"):
+                    vector["metadata"] = vec["metadata"]
+                all_vectors.append(vector)
+            
+            batches = self._split_upsert_batches(all_vectors)
+            semaphore = asyncio.Semaphore(self.settings.pinecone_upsert_concurrency)
             
-            logger.info(f"Upserted {result.upserted_count} vectors to Pinecone")
+            async def run_batch(batch_num: int, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._upsert_batch(batch_num, batch, namespace)
             
-            return {"upserted_count": result.upserted_count}
+            batch_results = await asyncio.gather(*[
+                run_batch(batch_num, batch) for batch_num, batch in enumerate(batches, 1)
+            ])
+            
+            upserted_count = sum(batch["count"] for batch in batch_results)
+            logger.info(
+                f"Upserted {upserted_count} vectors to Pinecone namespace {namespace or '(default)'} "
+                f"in {len(batches)} batches"
+            )
+            
+            return {"upserted_count": upserted_count, "batches": batch_results}
         except Exception as e:
             logger.error(f"Pinecone upsert failed: {str(e)}")
             raise VectorStoreError(f"Failed to upsert embeddings: {str(e)}")
@@ -120,19 +240,21 @@ class PineconeService:
         top_k: int = 5,
         filter: Optional[Dict[str, Any]] = None,
         include_metadata: bool = False, 
-        include_values: bool = False   
+        include_values: bool = False,
+        namespace: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Query similar vectors"""
-        if not self._index:
-            raise VectorStoreError("Vector store not connected")
-        
+        """Query similar vectors within a namespace"""
         try:
-            result = await self._index.query(
-                vector=query_vector,
-                top_k=top_k,
-                filter=filter,
-                include_values=include_values,
-                include_metadata=include_metadata,
+            result = await self._call_with_reconnect(
+                "query",
+                lambda: self._index.query(
+                    vector=query_vector,
+                    top_k=top_k,
+                    filter=filter,
+                    include_values=include_values,
+                    include_metadata=include_metadata,
+                    namespace=namespace,
+                )
             )
             
             matches = []
@@ -140,10 +262,11 @@ class PineconeService:
                 match_data = {
                     "id": match.id,
                     "score": match.score,
-                    # Safely access metadata and values if they exist
-                    # "metadata": match.metadata if match.metadata else {},
-                    # "values": match.values if match.values else [] 
                 }
+                if include_metadata:
+                    match_data["metadata"] = match.metadata if match.metadata else {}
+                if include_values:
+                    match_data["values"] = list(match.values) if match.values else []
                 matches.append(match_data)
             
             return matches
@@ -151,14 +274,43 @@ class PineconeService:
             logger.error(f"Pinecone query failed: {str(e)}")
             raise VectorStoreError(f"Query failed: {str(e)}")
     
-    async def delete_vectors(self, ids: List[str]) -> Dict[str, Any]:
-        """Delete vectors by IDs"""
-        if not self._index:
-            raise VectorStoreError("Vector store not connected")
-        
+    async def fetch_vectors(
+        self,
+        ids: List[str],
+        batch_size: int = 100,
+        namespace: Optional[str] = None
+    ) -> Dict[str, List[float]]:
+        """Fetch vector values by IDs from a namespace. IDs not found there are left out."""
         try:
-            await self._index.delete(ids=ids)
-            logger.info(f"Deleted vectors: {ids}")
+            vectors = {}
+            for start in range(0, len(ids), batch_size):
+                batch_ids = ids[start:start + batch_size]
+                result = await self._call_with_reconnect(
+                    "fetch",
+                    lambda: self._index.fetch(ids=batch_ids, namespace=namespace)
+                )
+                for vector_id, vector in result.vectors.items():
+                    vectors[vector_id] = list(vector.values)
+            return vectors
+        except Exception as e:
+            logger.error(f"Pinecone fetch failed: {str(e)}")
+            raise VectorStoreError(f"Failed to fetch vectors: {str(e)}")
+    
+    async def delete_vectors(
+        self,
+        ids: List[str],
+        namespace: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Dict[str, Any]:
+        """Delete vectors by IDs from a namespace, at most `batch_size` (Pinecone's limit is 1000) per request"""
+        try:
+            for start in range(0, len(ids), batch_size):
+                batch_ids = ids[start:start + batch_size]
+                await self._call_with_reconnect(
+                    "delete",
+                    lambda: self._index.delete(ids=batch_ids, namespace=namespace)
+                )
+            logger.info(f"Deleted {len(ids)} vectors from namespace {namespace or 'default'}")
             return {"deleted_count": len(ids)}
         except Exception as e:
             logger.error(f"Pinecone delete failed: {str(e)}")
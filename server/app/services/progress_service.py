@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+from app.core.config import get_settings
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionProgressService:
+    """
+    Per-document ingestion progress kept in Redis: the worker publishes pipeline
+    snapshots while it runs, the status API reads them back and derives an ETA.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.prefix = f"{self.settings.redis_prefix}ingestion_progress:"
+
+    def _key(self, document_id: str) -> str:
+        return f"{self.prefix}{document_id}"
+
+    def _counters_key(self, document_id: str) -> str:
+        # Counters bumped concurrently by fanned-out chunk batches, merged into the snapshot on read
+        return f"{self.prefix}{document_id}:counters"
+
+    async def publish(self, document_id: str, snapshot: Dict[str, Any]) -> None:
+        """Store the latest snapshot. Progress is best effort - failures never affect ingestion."""
+        try:
+            await redis_client.redis.set(
+                self._key(document_id),
+                json.dumps({**snapshot, 'updated_at': time.time()}),
+                ex=self.settings.ingestion_progress_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Failed to publish progress for document {document_id}: {str(e)}")
+
+    async def record_batch(
+        self,
+        document_id: str,
+        chunks_persisted: int,
+        chunk_cache_hits: int = 0,
+        chunk_cache_misses: int = 0
+    ) -> None:
+        """Count one finished chunk batch of a fanned-out document"""
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                pipe.hincrby(self._counters_key(document_id), 'chunks_persisted', chunks_persisted)
+                pipe.hincrby(self._counters_key(document_id), 'chunk_cache_hits', chunk_cache_hits)
+                pipe.hincrby(self._counters_key(document_id), 'chunk_cache_misses', chunk_cache_misses)
+                pipe.hincrby(self._counters_key(document_id), 'batches_done', 1)
+                pipe.expire(self._counters_key(document_id), self.settings.ingestion_progress_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record batch progress for document {document_id}: {str(e)}")
+
+    async def finish(self, document_id: str, state: str) -> None:
+        """Mark the last published snapshot as completed/failed, keeping its per-stage timings"""
+        snapshot = await self.get(document_id) or {}
+        snapshot['state'] = state
+        snapshot.pop('eta_seconds', None)
+        snapshot.pop('percent_complete', None)
+        await self.publish(document_id, snapshot)
+        try:
+            await redis_client.redis.delete(self._counters_key(document_id))
+        except Exception as e:
+            logger.warning(f"Failed to clear batch progress for document {document_id}: {str(e)}")
+
+    async def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Latest snapshot with `percent_complete` and `eta_seconds` filled in, or None"""
+        try:
+            async with redis_client.redis.pipeline(transaction=False) as pipe:
+                pipe.get(self._key(document_id))
+                pipe.hgetall(self._counters_key(document_id))
+                raw, counters = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to read progress for document {document_id}: {str(e)}")
+            return None
+
+        if raw is None:
+            return None
+
+        snapshot = json.loads(raw)
+        for field, value in counters.items():
+            snapshot[field] = int(value)
+        if snapshot.get('state') == 'running':
+            snapshot.update(self.estimate(snapshot))
+        return snapshot
+
+    @staticmethod
+    def estimate(snapshot: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """
+        Extrapolate the total chunk count from pages parsed so far, then the remaining
+        time from the rate at which chunks have been finished (persisted or skipped).
+        """
+        pages_total = snapshot.get('pages_total') or 0
+        pages_parsed = snapshot.get('pages_parsed') or 0
+        chunks_parsed = snapshot.get('chunks_parsed') or 0
+        chunks_done = (snapshot.get('chunks_persisted') or 0) + (snapshot.get('chunks_skipped') or 0)
+
+        if not pages_total or not pages_parsed or not chunks_parsed:
+            return {'percent_complete': 0.0, 'eta_seconds': None}
+
+        chunks_total = chunks_parsed * pages_total / pages_parsed
+        fraction = min(chunks_done / chunks_total, 1.0)
+        elapsed = (snapshot.get('elapsed_seconds') or 0) + max(time.time() - snapshot.get('updated_at', time.time()), 0)
+
+        eta = round(elapsed * (1 - fraction) / fraction, 1) if fraction > 0 else None
+        return {'percent_complete': round(fraction * 100, 1), 'eta_seconds': eta}
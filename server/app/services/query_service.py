@@ -1,14 +1,18 @@
-from typing import List
+from typing import Any, Dict, List, Tuple
 from app.repositories.document_repository import DocumentRepository
 from app.repositories.query_repository import QueryRepository
 from app.services.gemini_service import GeminiService
-from app.services.pinecone_service import PineconeService
+from app.services.vector_store import VectorStore, document_filter, stores_embeddings_with_chunks, vector_namespace
 from app.services.rag_agent_service import RAGAgentService
+from app.services.retrieval_postprocessor import RetrievalPostProcessor
 from app.schemas.query import ChunkSummaryDTO, QueryResponseDTO
 from app.models.query import QueryResponse
 from server.app.core.database import AsyncSession
-from app.core.exceptions import DocumentNotFoundError, EmbeddingError, VectorStoreError
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import DatabaseError, DocumentNotFoundError, EmbeddingError, VectorStoreError
+from app.core.config import get_settings
 
+import asyncio
 import logging
 
 
@@ -19,17 +23,19 @@ class QueryService:
     """Orchestrates the query processing workflow"""
     
     def __init__(self):
+        self.settings = get_settings()
         self.document_repo = DocumentRepository()
-        self.gemini_service = GeminiService()
+        self.gemini_service = GeminiService(budget="query")
         self.rag_service = RAGAgentService()
         self.query_repo = QueryRepository()
+        self.postprocessor = RetrievalPostProcessor()
     
     async def process_contract_query(
         self,
         query_text: str,
         document_id: str,
         user_id: str,
-        pinecone_service,
+        vector_store: VectorStore,
         db: AsyncSession
     ) -> QueryResponse:
         """ Process a user query against a contract document """
@@ -40,17 +46,24 @@ class QueryService:
         # Generate embedding
         query_embedding = await self._generate_embedding(query_text)
         
-        # Vector search
-        embedding_ids = await self._search_similar_chunks(
-            query_embedding,
-            pinecone_service
-        )
-        
-        # Retrieve chunks
-        chunk_summaries = await self._retrieve_chunk_summaries(
-            embedding_ids,
-            db
-        )
+        if self.settings.retrieval_mode == "hybrid":
+            # Full-text and vector search side by side, fused by rank
+            chunk_summaries = await self._hybrid_search(
+                query_text,
+                query_embedding,
+                document_id,
+                user_id,
+                vector_store,
+                db
+            )
+        else:
+            chunk_summaries = await self._vector_search(
+                query_embedding,
+                document_id,
+                user_id,
+                vector_store,
+                db
+            )
         
         # Execute RAG
         query_response = await self._execute_rag_query(
@@ -97,34 +110,159 @@ class QueryService:
             logger.error(f"Embedding generation failed: {str(e)}")
             raise EmbeddingError(f"Failed to generate query embedding: {str(e)}")
     
+    async def _vector_search(
+        self,
+        query_embedding: List[float],
+        document_id: str,
+        user_id: str,
+        vector_store: VectorStore,
+        db: AsyncSession
+    ) -> List[ChunkSummaryDTO]:
+        """
+        Dense retrieval of the document's chunk summaries, in descending similarity order.
+        """
+        if stores_embeddings_with_chunks():
+            # pgvector: ranking and summaries in one query
+            return await self._search_chunk_summaries(
+                query_embedding,
+                document_id,
+                db
+            )
+        
+        # Vector search, scoped to the document
+        matches = await self._search_similar_chunks(
+            query_embedding,
+            vector_store,
+            document_id,
+            user_id,
+            db
+        )
+        
+        # Retrieve chunks
+        return await self._retrieve_chunk_summaries(
+            matches,
+            document_id,
+            db
+        )
+    
+    async def _hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        document_id: str,
+        user_id: str,
+        vector_store: VectorStore,
+        db: AsyncSession
+    ) -> List[ChunkSummaryDTO]:
+        """
+        Run the vector and full-text searches concurrently and fuse them with reciprocal rank fusion.
+        Exact terms (clause names, section numbers, parties) that dense retrieval over summaries misses
+        still reach the prompt, without raising the number of chunks sent.
+        """
+        vector_chunks, lexical_chunks = await asyncio.gather(
+            self._vector_search(query_embedding, document_id, user_id, vector_store, db),
+            self._search_lexical_chunks(query_text, document_id)
+        )
+        
+        # Vector hits carry a similarity score, lexical-only hits don't
+        chunks_by_id = {chunk.embedding_id: chunk for chunk in lexical_chunks}
+        chunks_by_id.update({chunk.embedding_id: chunk for chunk in vector_chunks})
+        
+        fused = self._reciprocal_rank_fusion(
+            [
+                [chunk.embedding_id for chunk in vector_chunks],
+                [chunk.embedding_id for chunk in lexical_chunks]
+            ],
+            self.settings.retrieval_rrf_k
+        )
+        
+        logger.debug(
+            f"Hybrid retrieval for document {document_id}: {len(vector_chunks)} vector, "
+            f"{len(lexical_chunks)} full-text, {len(fused)} fused"
+        )
+        return [chunks_by_id[embedding_id] for embedding_id, _ in fused[:self.settings.retrieval_max_k]]
+    
+    async def _search_lexical_chunks(
+        self,
+        query_text: str,
+        document_id: str
+    ) -> List[ChunkSummaryDTO]:
+        """
+        Full-text search over the document's chunks. Runs on its own session so it can overlap
+        with the vector search, and degrades to no results rather than failing the query.
+        """
+        try:
+            async with AsyncSessionLocal() as lexical_db:
+                chunks = await self.query_repo.search_chunks_by_text(
+                    query_text=query_text,
+                    document_id=document_id,
+                    top_k=self.settings.retrieval_lexical_k,
+                    db=lexical_db
+                )
+        except DatabaseError as e:
+            logger.warning(f"Full-text search failed, using vector results only: {str(e)}")
+            return []
+        
+        return [
+            ChunkSummaryDTO(
+                embedding_id=chunk.embedding_id,
+                summary=chunk.summary,
+                relevance_score=None
+            )
+            for chunk in chunks
+        ]
+    
+    @staticmethod
+    def _reciprocal_rank_fusion(rankings: List[List[str]], k: int) -> List[Tuple[str, float]]:
+        """
+        Score every ID by sum(1 / (k + rank)) over the rankings it appears in (rank starting at 1),
+        highest first. Ties keep the order in which IDs were first seen.
+        """
+        scores: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, item_id in enumerate(ranking, 1):
+                scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    
     async def _search_similar_chunks(
         self,
         query_embedding: List[float],
-        pinecone_service : PineconeService,
-        top_k: int = 5
-    ) -> List[str]:
+        vector_store: VectorStore,
+        document_id: str,
+        user_id: str,
+        db: AsyncSession
+    ) -> List[Dict[str, Any]]:
         """
-        Search vector store for similar chunks.
+        Search the user's namespace for the document's most similar chunks.
+        Returns the post-processed matches ({"id", "score"}) in descending score order.
         """
-        if not pinecone_service:
+        if not vector_store:
             raise VectorStoreError(
                 operation="query",
                 details="Vector store service not available"
             )
         
         try:
-            results = await pinecone_service.query_similar(
+            # Over-fetch with vectors - the post-processor decides how many are worth keeping
+            top_k = self.settings.retrieval_candidate_k
+            include_values = self.settings.retrieval_mmr_lambda < 1.0
+            results = await vector_store.query_similar(
                 query_vector=query_embedding,
-                top_k=top_k
+                top_k=top_k,
+                filter=document_filter(document_id),
+                include_values=include_values,
+                namespace=vector_namespace(user_id)
             )
             
-            embedding_ids = [result['id'] for result in results]
-            
-            if not embedding_ids:
-                logger.warning("No similar chunks found in vector store")
-                return []
-            
-            return embedding_ids
+            legacy = not results and self.settings.vector_store_legacy_fallback
+            if legacy:
+                # Vectors written before namespaces carry no metadata - search unscoped
+                logger.info(f"No namespaced vectors for document {document_id}, searching legacy vectors")
+                results = await vector_store.query_similar(
+                    query_vector=query_embedding,
+                    top_k=top_k,
+                    include_values=include_values
+                )
             
         except Exception as e:
             logger.error(f"Vector search failed: {str(e)}")
@@ -132,30 +270,86 @@ class QueryService:
                 operation="query",
                 details=str(e)
             )
+        
+        if legacy and results:
+            # Other documents' chunks must not compete for the post-processor's slots
+            own_ids = await self.query_repo.get_document_embedding_ids(
+                embedding_ids=[result['id'] for result in results],
+                document_id=document_id,
+                db=db
+            )
+            results = [result for result in results if result['id'] in own_ids]
+        
+        if not results:
+            logger.warning("No similar chunks found in vector store")
+            return []
+        
+        return self.postprocessor.process(results)
+    
+    async def _search_chunk_summaries(
+        self,
+        query_embedding: List[float],
+        document_id: str,
+        db: AsyncSession
+    ) -> List[ChunkSummaryDTO]:
+        """
+        Rank the document's chunks against the query in Postgres and return the summaries
+        the post-processor keeps.
+        """
+        chunks = await self.query_repo.search_similar_chunks(
+            query_embedding=query_embedding,
+            top_k=self.settings.retrieval_candidate_k,
+            db=db,
+            document_id=document_id,
+            include_embeddings=self.settings.retrieval_mmr_lambda < 1.0
+        )
+        
+        if not chunks:
+            logger.warning(f"No embedded chunks found for document {document_id}")
+            return []
+        
+        summaries = {chunk.embedding_id: chunk.summary for chunk in chunks}
+        matches = self.postprocessor.process([
+            {"id": chunk.embedding_id, "score": chunk.score, "values": chunk.embedding}
+            for chunk in chunks
+        ])
+        
+        return [
+            ChunkSummaryDTO(
+                embedding_id=match['id'],
+                summary=summaries[match['id']],
+                relevance_score=match['score']
+            )
+            for match in matches
+        ]
     
     async def _retrieve_chunk_summaries(
         self,
-        embedding_ids: List[str],
+        matches: List[Dict[str, Any]],
+        document_id: str,
         db: AsyncSession
     ) -> List[ChunkSummaryDTO]:
         """
-        Retrieve and format chunk summaries.
+        Retrieve chunk summaries for the matches, keeping their scores and order.
         """
-        if not embedding_ids:
+        if not matches:
             return []
         
-        chunks = await self.document_repo.get_chunks_by_embedding_ids(
-            embedding_ids=embedding_ids,
-            db=db
+        chunks = await self.query_repo.get_chunks_by_embedding_ids(
+            embedding_ids=[match['id'] for match in matches],
+            db=db,
+            document_id=document_id
         )
+        summaries = {chunk.embedding_id: chunk.summary for chunk in chunks}
         
         return [
             ChunkSummaryDTO(
-                embedding_id=chunk.embedding_id,
-                summary=chunk.summary,
-                relevance_score=None
+                embedding_id=match['id'],
+                summary=summaries[match['id']],
+                relevance_score=match['score']
             )
-            for chunk in chunks
+            for match in matches
+            if match['id'] in summaries
         ]
     
     async def _execute_rag_query(
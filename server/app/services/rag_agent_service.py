@@ -9,6 +9,8 @@ from app.schemas.query import ChunkSummaryDTO
 from app.core.exceptions import ExternalServiceError, DatabaseError
 import asyncio
 from app.repositories.query_repository import QueryRepository
+from app.services.rate_limiter import get_rate_limiter
+from app.services.gemini_service import is_rate_limit_error
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,8 @@ class RAGAgentService:
     def __init__(self):
         self.settings = get_settings()
         self.query_repo = QueryRepository()
+        # Interactive queries draw from their own budget so ingestion can't starve them
+        self.rate_limiter = get_rate_limiter("query")
         try:
              self.llm = ChatGoogleGenerativeAI(
                  model=self.settings.gemini_model,
@@ -175,17 +179,21 @@ CONSTRAINTS:
         
         for attempt in range(max_retries):
             try:
+                await self.rate_limiter.acquire(len(prompt) // 4)
                 response = await self.llm.ainvoke(prompt)
+                await self.rate_limiter.record_success()
                 return response.content
                 
             except Exception as e:
                 error_msg = str(e).lower()
+                if is_rate_limit_error(e):
+                    await self.rate_limiter.record_rate_limited()
                 
                 # Check if we should retry
                 is_retryable = any(
                     keyword in error_msg 
-                    for keyword in ['rate limit', 'timeout', 'quota', 'connection']
-                )
+                    for keyword in ['timeout', 'connection']
+                ) or is_rate_limit_error(e)
                 
                 if attempt < max_retries - 1 and is_retryable:
                     wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
@@ -0,0 +1,254 @@
+import asyncio
+import random
+import time
+import logging
+from functools import lru_cache
+from typing import Union
+from app.core.config import get_settings
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket holding up to `capacity` tokens, refilled at `refill_rate` tokens/second"""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        if capacity <= 0 or refill_rate <= 0:
+            raise ValueError("Token bucket capacity and refill rate must be positive")
+
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until `amount` tokens are available and take them. Returns seconds spent waiting."""
+        # A request larger than the bucket could never be served - cap it at a full bucket
+        amount = min(amount, self.capacity)
+        waited = 0.0
+
+        # Holding the lock while sleeping keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+
+                wait_time = (amount - self._tokens) / self.refill_rate
+                await asyncio.sleep(wait_time)
+                waited += wait_time
+
+
+class RateLimiter:
+    """Request-rate and token-rate limits for an LLM API, e.g. Gemini RPM/TPM quotas"""
+
+    def __init__(self, requests_per_second: float, tokens_per_minute: int):
+        self.requests = TokenBucket(
+            capacity=max(1.0, requests_per_second),
+            refill_rate=requests_per_second
+        )
+        self.tokens = TokenBucket(
+            capacity=tokens_per_minute,
+            refill_rate=tokens_per_minute / 60
+        )
+        self.total_wait_time = 0.0
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """Reserve one request and `estimated_tokens` tokens. Returns seconds spent waiting."""
+        waited = await self.requests.acquire(1)
+        if estimated_tokens > 0:
+            waited += await self.tokens.acquire(estimated_tokens)
+
+        if waited > 0:
+            logger.debug(f"Rate limiting: waited {waited:.2f}s")
+
+        self.total_wait_time += waited
+        return waited
+
+    async def record_success(self) -> None:
+        """Local limits are fixed - nothing to adapt"""
+
+    async def record_rate_limited(self) -> None:
+        """Local limits are fixed - nothing to adapt"""
+
+
+# Refill both buckets of a budget and take one request plus ARGV[3] tokens if both allow it.
+# Returns 0 when taken, otherwise the seconds until it could be. Uses Redis time so
+# clocks of the calling processes don't matter.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local scale = tonumber(redis.call('HGET', KEYS[3], 'scale') or '1')
+
+local rps = tonumber(ARGV[1]) * scale
+local tokens_per_second = tonumber(ARGV[2]) / 60 * scale
+local request_capacity = math.max(1, rps)
+local token_capacity = tonumber(ARGV[2]) * scale
+local amount = math.min(tonumber(ARGV[3]), token_capacity)
+
+local function refill(key, capacity, rate)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+
+local requests = refill(KEYS[1], request_capacity, rps)
+local tokens = refill(KEYS[2], token_capacity, tokens_per_second)
+
+local wait = 0
+if requests < 1 then
+    wait = (1 - requests) / rps
+end
+if amount > 0 and tokens < amount then
+    wait = math.max(wait, (amount - tokens) / tokens_per_second)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - amount
+end
+
+redis.call('HSET', KEYS[1], 'tokens', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+redis.call('EXPIRE', KEYS[2], 3600)
+return tostring(wait)
+"""
+
+# Multiplicative decrease of a budget's scale, at most once per ARGV[3] seconds so a burst
+# of concurrent 429s counts as one congestion signal
+_DECREASE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'scale', 'last_decrease')
+local scale = tonumber(state[1]) or 1
+local last_decrease = tonumber(state[2]) or 0
+if now - last_decrease >= tonumber(ARGV[3]) then
+    scale = math.max(tonumber(ARGV[2]), scale * tonumber(ARGV[1]))
+    redis.call('HSET', KEYS[1], 'scale', scale, 'last_decrease', now)
+end
+return tostring(scale)
+"""
+
+# Additive increase of a budget's scale, back up to the configured ceiling
+_INCREASE_SCRIPT = """
+local scale = tonumber(redis.call('HGET', KEYS[1], 'scale') or '1')
+if scale < 1 then
+    scale = math.min(1, scale + tonumber(ARGV[1]))
+    redis.call('HSET', KEYS[1], 'scale', scale)
+end
+return tostring(scale)
+"""
+
+
+class DistributedRateLimiter:
+    """
+    Request-rate and token-rate budget shared by every process through Redis.
+
+    The configured limits are the ceiling; a shared AIMD scale in (min_scale, 1] shrinks
+    the budget multiplicatively when Gemini answers 429 and grows it additively on success,
+    so the cluster settles just under the real quota. Falls back to a per-process
+    `RateLimiter` while Redis is unavailable.
+    """
+
+    def __init__(self, budget: str, requests_per_second: float, tokens_per_minute: int):
+        self.settings = get_settings()
+        self.budget = budget
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+
+        prefix = f"{self.settings.redis_prefix}rate_limit:{budget}:"
+        self.requests_key = f"{prefix}requests"
+        self.tokens_key = f"{prefix}tokens"
+        self.aimd_key = f"{prefix}aimd"
+
+        self.local = RateLimiter(requests_per_second, tokens_per_minute)
+        self.total_wait_time = 0.0
+        self._scripts = None
+        self._scripts_client = None
+
+    def _get_scripts(self):
+        redis = redis_client.redis
+        # Scripts are bound to the client they were registered on - re-register after a reconnect
+        if self._scripts is None or self._scripts_client is not redis:
+            self._scripts_client = redis
+            self._scripts = (
+                redis.register_script(_ACQUIRE_SCRIPT),
+                redis.register_script(_DECREASE_SCRIPT),
+                redis.register_script(_INCREASE_SCRIPT),
+            )
+        return self._scripts
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """Reserve one request and `estimated_tokens` tokens from the shared budget. Returns seconds spent waiting."""
+        waited = 0.0
+        try:
+            acquire_script = self._get_scripts()[0]
+            while True:
+                wait_time = float(await acquire_script(
+                    keys=[self.requests_key, self.tokens_key, self.aimd_key],
+                    args=[self.requests_per_second, self.tokens_per_minute, estimated_tokens]
+                ))
+                if wait_time <= 0:
+                    break
+                # Jitter so waiters across processes don't retry in lockstep
+                wait_time *= 1 + random.random() * 0.1
+                await asyncio.sleep(wait_time)
+                waited += wait_time
+        except Exception as e:
+            logger.warning(f"Shared {self.budget} rate limit unavailable, limiting locally: {str(e)}")
+            waited += await self.local.acquire(estimated_tokens)
+
+        if waited > 0:
+            logger.debug(f"Rate limiting ({self.budget}): waited {waited:.2f}s")
+
+        self.total_wait_time += waited
+        return waited
+
+    async def record_success(self) -> None:
+        """Additive increase of the shared budget"""
+        try:
+            increase_script = self._get_scripts()[2]
+            await increase_script(keys=[self.aimd_key], args=[self.settings.gemini_aimd_increase_step])
+        except Exception as e:
+            logger.debug(f"Failed to update {self.budget} rate budget: {str(e)}")
+
+    async def record_rate_limited(self) -> None:
+        """Multiplicative decrease of the shared budget after a 429"""
+        try:
+            decrease_script = self._get_scripts()[1]
+            scale = float(await decrease_script(
+                keys=[self.aimd_key],
+                args=[
+                    self.settings.gemini_aimd_decrease_factor,
+                    self.settings.gemini_aimd_min_scale,
+                    self.settings.gemini_aimd_cooldown_seconds
+                ]
+            ))
+            logger.warning(f"Gemini rate limited - {self.budget} budget scaled to {scale:.2f}")
+        except Exception as e:
+            logger.debug(f"Failed to update {self.budget} rate budget: {str(e)}")
+
+
+@lru_cache()
+def get_rate_limiter(budget: str) -> Union[RateLimiter, DistributedRateLimiter]:
+    """Process-wide limiter for a Gemini budget ("ingestion" or "query"), shared by all service instances"""
+    settings = get_settings()
+    if budget == "query":
+        requests_per_second = settings.gemini_query_requests_per_second
+        tokens_per_minute = settings.gemini_query_tokens_per_minute
+    else:
+        requests_per_second = settings.gemini_requests_per_second
+        tokens_per_minute = settings.gemini_tokens_per_minute
+
+    if settings.gemini_rate_limit_backend == "redis":
+        return DistributedRateLimiter(budget, requests_per_second, tokens_per_minute)
+    return RateLimiter(requests_per_second, tokens_per_minute)
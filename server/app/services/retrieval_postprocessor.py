@@ -0,0 +1,84 @@
+import logging
+from typing import Any, Dict, List
+import numpy as np
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalPostProcessor:
+    """
+    Turns raw vector matches ({"id", "score", "values"?}) into the chunks worth sending to the LLM:
+    drops matches below `retrieval_min_score`, picks how many to keep from the largest score gap
+    (between `retrieval_min_k` and `retrieval_max_k`), and spreads that budget across distinct
+    passages with maximal marginal relevance when the match vectors are available.
+    Results come back in descending score order.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+
+    def process(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ranked = sorted(matches, key=lambda match: match['score'], reverse=True)
+        candidates = [match for match in ranked if match['score'] >= self.settings.retrieval_min_score]
+        if not candidates:
+            if ranked:
+                logger.info(
+                    f"All {len(ranked)} matches scored below {self.settings.retrieval_min_score} "
+                    f"(best {ranked[0]['score']:.3f})"
+                )
+            return []
+
+        k = self.adaptive_k([match['score'] for match in candidates])
+
+        if k < len(candidates) and self.settings.retrieval_mmr_lambda < 1.0 and all(
+            match.get('values') for match in candidates
+        ):
+            selected = self.mmr(
+                np.asarray([match['values'] for match in candidates], dtype=np.float32),
+                np.asarray([match['score'] for match in candidates], dtype=np.float32),
+                k,
+                self.settings.retrieval_mmr_lambda
+            )
+            kept = [candidates[position] for position in sorted(selected)]
+        else:
+            kept = candidates[:k]
+
+        logger.debug(f"Kept {len(kept)} of {len(matches)} matches ({len(candidates)} above the score floor)")
+        return kept
+
+    def adaptive_k(self, scores: List[float]) -> int:
+        """
+        Cut at the first drop of at least `retrieval_score_gap` between consecutive scores
+        (sorted, descending) - the matches after a cliff are rarely about the question
+        """
+        max_k = min(self.settings.retrieval_max_k, len(scores))
+        min_k = min(self.settings.retrieval_min_k, max_k)
+        for k in range(max(min_k, 1), max_k):
+            if scores[k - 1] - scores[k] >= self.settings.retrieval_score_gap:
+                return k
+        return max_k
+
+    @staticmethod
+    def mmr(vectors: np.ndarray, relevance: np.ndarray, k: int, lambda_: float) -> List[int]:
+        """
+        Maximal marginal relevance: greedily pick the candidate maximizing
+        lambda * relevance - (1 - lambda) * (max similarity to anything already picked).
+        Returns the positions picked, in pick order.
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        similarity = vectors @ vectors.T
+
+        first = int(np.argmax(relevance))
+        selected = [first]
+        max_similarity = similarity[first].copy()
+
+        for _ in range(1, min(k, len(relevance))):
+            scores = lambda_ * relevance - (1 - lambda_) * max_similarity
+            scores[selected] = -np.inf
+            picked = int(np.argmax(scores))
+            selected.append(picked)
+            np.maximum(max_similarity, similarity[picked], out=max_similarity)
+
+        return selected
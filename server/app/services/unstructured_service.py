@@ -1,53 +1,244 @@
+
 import asyncio
-from typing import List, Dict, Any
+import os
+from collections import deque
+from typing import List, Any, AsyncIterator, Callable, Optional, Tuple
 import aiohttp
 import aiofiles
+import tempfile
 from pathlib import Path
 from server.app.core.config import Settings
 
+# Shared by all UnstructuredService instances in this process, created on first use
+_process_pool = None
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_http_session() -> aiohttp.ClientSession:
+    """Pooled HTTP session reused across downloads on the current event loop"""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session_loop = loop
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=300, sock_read=60)
+        )
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+def _get_process_pool(max_workers: int):
+    global _process_pool
+    if _process_pool is None:
+        # billiard (Celery's multiprocessing fork) lets daemonic prefork workers have children,
+        # which the stdlib pools refuse. spawn: never fork a process that owns an event loop.
+        import billiard
+        _process_pool = billiard.get_context("spawn").Pool(processes=max_workers)
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.terminate()
+        _process_pool = None
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None):
+    # The window may have been cancelled while it was being parsed
+    if future.done():
+        return
+    if error is not None:
+        # billiard reports failures as ExceptionInfo wrapping the worker's exception
+        future.set_exception(getattr(error, "exception", error))
+    else:
+        future.set_result(result)
+
+
+def _split_open_section(elements: List[Any]) -> Tuple[List[Any], List[Any]]:
+    """Split elements before the last title: the sections before it are complete, the last may continue"""
+    for position in range(len(elements) - 1, 0, -1):
+        if getattr(elements[position], "category", None) == "Title":
+            return elements[:position], elements[position:]
+    return [], elements
+
+
+def _partition_pages(pdf_path: str, first_page: int, last_page: int) -> List[Any]:
+    """Partition pages first_page..last_page (1-based, inclusive) into elements. Runs in a pool process."""
+    from pypdf import PdfReader, PdfWriter
+    from unstructured.partition.pdf import partition_pdf
+
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for page in reader.pages[first_page - 1:last_page]:
+        writer.add_page(page)
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
+        writer.write(tmp_file)
+        range_path = tmp_file.name
+
+    try:
+        return partition_pdf(
+            filename=range_path,
+            strategy="fast",
+            extract_images_in_pdf=True,
+            extract_image_block_types=["Image"],
+            starting_page_number=first_page
+        )
+    finally:
+        Path(range_path).unlink(missing_ok=True)
+
+
 class UnstructuredService:
-    
+
     def __init__(self):
         self.settings = Settings()
-        
-    async def parse_pdf(self, pdf_url : str) -> List[Dict[str, Any]]:
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(pdf_url) as response:
-                pdf_content = await response.read() 
-                
-        async with aiofiles.tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
-            await tmp_file.write(pdf_content)
-            tmp_path = tmp_file.name
-            
+        self.parse_processes = self.settings.pdf_parse_processes or os.cpu_count() or 1
+
+    async def stream_chunks(
+        self,
+        pdf_url: str,
+        content_hash: Optional[str] = None,
+        on_pages: Optional[Callable[[int, int], None]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Partition the PDF window by window (`pdf_parse_window_pages` pages at a time, up to
+        `pdf_parse_processes` windows in parallel) and yield each window's chunks, in page order,
+        as soon as it is partitioned. The last section of a window may continue on the next pages,
+        so it is held back and chunked together with the next window.
+        `on_pages(pages_parsed, page_count)` is called as each window is partitioned.
+        """
+        tmp_path, is_temporary = await self._fetch_pdf(pdf_url, content_hash)
+        pending = deque()
+
         try:
-            chunks = await asyncio.to_thread(
-                self._parse_pdf_sync,
-                tmp_path
-            )
-        
-            return chunks      
-        
+            page_count = await asyncio.to_thread(self._count_pages, tmp_path)
+            page_ranges = iter(self._page_ranges(page_count))
+            pages_parsed = 0
+            if on_pages:
+                on_pages(pages_parsed, page_count)
+
+            def submit_next():
+                page_range = next(page_ranges, None)
+                if page_range:
+                    pending.append((*page_range, self._partition(tmp_path, *page_range)))
+
+            for _ in range(self.parse_processes):
+                submit_next()
+
+            open_section = []
+            while pending:
+                first_page, last_page, future = pending.popleft()
+                elements = open_section + await future
+                submit_next()
+
+                pages_parsed += last_page - first_page + 1
+                if on_pages:
+                    on_pages(pages_parsed, page_count)
+
+                carried = bool(open_section)
+                complete, open_section = _split_open_section(elements)
+                if not pending or (carried and not complete):
+                    # Last window, or a section longer than a whole window - don't hold it back any longer
+                    complete, open_section = elements, []
+
+                if complete:
+                    for chunk in await asyncio.to_thread(self._chunk_elements, complete):
+                        yield chunk
+
         finally:
-            # Clean up temporary file
-            Path(tmp_path).unlink(missing_ok=True)            
-                
-    def _parse_pdf_sync(self, pdf_path:str):
-        from unstructured.partition.pdf import partition_pdf
-        from unstructured.chunking.title import chunk_by_title
-        
-        elements = partition_pdf(
-            filename=pdf_path,
-            strategy="fast",  # High resolution for better extraction
-            extract_images_in_pdf=True,
-            extract_image_block_types=["Image"],
-            chunking_strategy="by_title",
-            max_characters=self.settings.chunk_size,    
-            overlap=self.settings.chunk_overlap
+            for _, _, future in pending:
+                future.cancel()
+            if is_temporary:
+                Path(tmp_path).unlink(missing_ok=True)
+
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        window = self.settings.pdf_parse_window_pages or page_count
+        return [
+            (first_page, min(first_page + window - 1, page_count))
+            for first_page in range(1, page_count + 1, window)
+        ]
+
+    def _partition(self, pdf_path: str, first_page: int, last_page: int) -> asyncio.Future:
+        """Partition a page range in the process pool, or in a thread when parallel parsing is off"""
+        if self.parse_processes <= 1:
+            return asyncio.ensure_future(
+                asyncio.to_thread(_partition_pages, pdf_path, first_page, last_page)
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Pool callbacks run on billiard's result thread
+        _get_process_pool(self.parse_processes).apply_async(
+            _partition_pages,
+            (pdf_path, first_page, last_page),
+            callback=lambda result: loop.call_soon_threadsafe(_resolve, future, result),
+            error_callback=lambda error: loop.call_soon_threadsafe(_resolve, future, None, error)
         )
-        chunks = chunk_by_title(elements=elements, max_characters=3000, new_after_n_chars=2400, combine_text_under_n_chars=500)
-        return chunks
-            
+        return future
+
+    def spooled_pdf_path(self, content_hash: str) -> Optional[Path]:
+        """Where the API spools uploads for workers sharing its volume, if configured"""
+        if not self.settings.pdf_spool_dir:
+            return None
+        return Path(self.settings.pdf_spool_dir) / f"{content_hash}.pdf"
+
+    def release_spooled_pdf(self, content_hash: Optional[str]):
+        """Drop a spooled upload once the document no longer needs it"""
+        spooled_path = self.spooled_pdf_path(content_hash) if content_hash else None
+        if spooled_path:
+            spooled_path.unlink(missing_ok=True)
+
+    async def _fetch_pdf(self, pdf_url: str, content_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Return (path, is_temporary) for the PDF. A spooled upload or local file URL is read in place;
+        anything else is downloaded to a temporary file.
+        """
+        if content_hash:
+            spooled_path = self.spooled_pdf_path(content_hash)
+            if spooled_path and spooled_path.exists():
+                return str(spooled_path), False
+
+        if pdf_url.startswith("file://"):
+            return pdf_url[len("file://"):], False
+
+        return await self._download_pdf(pdf_url), True
+
+    async def _download_pdf(self, pdf_url: str) -> str:
+        """Stream the PDF to a temporary file in fixed-size blocks and return its path"""
+        session = _get_http_session()
+        block_size = self.settings.pdf_download_chunk_bytes
 
-                             
-            
\ No newline at end of file
+        async with aiofiles.tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
+            try:
+                async with session.get(pdf_url) as response:
+                    response.raise_for_status()
+                    async for block in response.content.iter_chunked(block_size):
+                        await tmp_file.write(block)
+            except Exception:
+                Path(tmp_file.name).unlink(missing_ok=True)
+                raise
+            return tmp_file.name
+
+    def _count_pages(self, pdf_path: str) -> int:
+        from pypdf import PdfReader
+
+        return len(PdfReader(pdf_path).pages)
+
+    def _chunk_elements(self, elements: List[Any]):
+        from unstructured.chunking.title import chunk_by_title
+
+        return chunk_by_title(
+            elements=elements,
+            max_characters=self.settings.chunk_size,
+            overlap=self.settings.chunk_overlap,
+            combine_text_under_n_chars=500
+        )
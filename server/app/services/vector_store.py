@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Protocol
+from app.core.config import get_settings
+
+
+class VectorStore(Protocol):
+    """
+    What ingestion and retrieval need from a vector index.
+    Vectors are upserted as {"embedding_id", "embedding", "metadata"} dicts ("metadata" optional);
+    queries return [{"id", "score"}] ordered by descending similarity. Every operation is scoped
+    to a namespace - None is the default namespace that holds vectors written before namespaces.
+    """
+
+    async def connect(self) -> None: ...
+
+    async def disconnect(self) -> None: ...
+
+    async def ensure_connected(self) -> None: ...
+
+    async def upsert_embeddings(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]: ...
+
+    async def query_similar(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        namespace: Optional[str] = None
+    ) -> List[Dict[str, Any]]: ...
+
+    async def fetch_vectors(
+        self,
+        ids: List[str],
+        batch_size: int = 100,
+        namespace: Optional[str] = None
+    ) -> Dict[str, List[float]]: ...
+
+    async def delete_vectors(self, ids: List[str], namespace: Optional[str] = None) -> Dict[str, Any]: ...
+
+
+def vector_namespace(user_id: str) -> Optional[str]:
+    """Namespace holding a user's vectors, or None (default namespace) when namespacing is off"""
+    if not get_settings().vector_store_user_namespaces:
+        return None
+    return f"user-{user_id}"
+
+
+def document_vector_metadata(document_id: str) -> Dict[str, Any]:
+    """Metadata stored with every chunk vector, so queries can be restricted to one document"""
+    return {"document_id": document_id}
+
+
+def document_filter(document_id: str) -> Dict[str, Any]:
+    return {"document_id": {"$eq": document_id}}
+
+
+def stores_embeddings_with_chunks() -> bool:
+    """True when vectors live on document_chunks rows and are written with them (pgvector backend)"""
+    return get_settings().vector_store_backend == "pgvector"
+
+
+def create_vector_store() -> VectorStore:
+    """Vector store selected by `vector_store_backend` ("pinecone", "local" or "pgvector")"""
+    settings = get_settings()
+    backend = settings.vector_store_backend
+
+    # Imported lazily so each backend's dependencies are only needed when it is used
+    if backend == "pinecone":
+        from app.services.pinecone_service import PineconeService
+        return PineconeService()
+    if backend == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    if backend == "pgvector":
+        from app.services.pgvector_store import PgVectorStore
+        return PgVectorStore()
+
+    raise ValueError(f"Unknown vector store backend: {backend}")
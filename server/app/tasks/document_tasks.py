@@ -1,111 +1,758 @@
 from app.celery_app import celery_app
+from celery import chord, group, signature
+from celery.signals import task_postrun
+from app.core.database import AsyncSessionLocal
 from app.models.document import Document, DocumentChunk, ProcessingStatus
-from app.models.user import User
+from app.repositories.document_repository import DocumentRepository, DocumentChunkRepository
 from app.services.unstructured_service import UnstructuredService
 from app.services.gemini_service import GeminiService
-from app.services.pinecone_service import PineconeService
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.blob_store import get_blob_store
+from app.services.cloudinary_service import CloudinaryService
+from app.services.progress_service import IngestionProgressService
+from app.services.checkpoint_service import IngestionCheckpointService
+from app.services.ingestion_scheduler import ingestion_scheduler
+from app.services.vector_store import (
+    VectorStore, document_vector_metadata, stores_embeddings_with_chunks, vector_namespace
+)
+from app.tasks.worker_loop import run_in_worker_loop, get_worker_vector_store
 from sqlalchemy.exc import SQLAlchemyError
-from app.core.exceptions import DocumentProcessingError, VectorStoreError
-import logging
+from app.core.exceptions import DatabaseError, DocumentProcessingError, VectorStoreError
+from app.utils.hashing import chunk_content_hash, chunk_vector_id, stored_chunk_content_hash
+from app.core.config import get_settings
+from typing import Any, Dict, List, Optional
 import asyncio
-from server.app.core.config import Settings
+import functools
+import logging
+import random
+import time
 
-settings = Settings()
 logger = logging.getLogger(__name__)
 
-# In your database.py or config
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+settings = get_settings()
 
-# Sync engine for Celery
-sync_engine = create_engine(
-    settings.database_url.replace('postgresql+asyncpg://', 'postgresql+psycopg2://'),
-    pool_pre_ping=True
-)
+document_repo = DocumentRepository()
+chunk_repo = DocumentChunkRepository()
+progress_service = IngestionProgressService()
+
+
+# Tasks dispatched through IngestionScheduler, which hold a per-user slot while they run
+SCHEDULED_TASKS = {'process_document', 'process_document_version', 'clone_document'}
+
+# Slots of fanned-out documents, released by the chord's callback or errback instead
+_handed_off_slots = set()
+
+
+@task_postrun.connect
+def release_ingestion_slot(sender=None, task_id=None, state=None, **kwargs):
+    # A retrying task keeps its slot; anything else (success, final failure) frees it
+    if sender is None or sender.name not in SCHEDULED_TASKS or state == 'RETRY':
+        return
+    if task_id in _handed_off_slots:
+        _handed_off_slots.discard(task_id)
+        return
+    run_in_worker_loop(ingestion_scheduler.release(task_id))
+
+
+@celery_app.task(name='dispatch_ingestion', ignore_result=True)
+def dispatch_ingestion_task():
+    # Submit and release only dispatch on their own events - this recovers anything they left queued
+    return run_in_worker_loop(_dispatch_ingestion())
+
+
+async def _dispatch_ingestion():
+    await ingestion_scheduler.reclaim_expired()
+    dispatched = await ingestion_scheduler.dispatch()
+
+    stats = await ingestion_scheduler.get_stats()
+    pending = sum(user['pending'] for lane in stats.values() for user in lane.values())
+    if pending:
+        logger.info(f"Ingestion backlog after dispatch: {stats}")
+    return dispatched
 
-SyncSessionLocal = sessionmaker(bind=sync_engine, expire_on_commit=False)
 
 @celery_app.task(bind=True, name='process_document')
 def process_document_task(self, document_id: str):
-    
-    with SyncSessionLocal() as db:
+    # The whole task runs as one coroutine on the worker's persistent event loop
+    return run_in_worker_loop(_process_document(self, document_id))
+
+
+@celery_app.task(bind=True, name='process_document_version')
+def process_document_version_task(self, document_id: str, superseded_public_id: Optional[str] = None):
+    # New version of an existing document: only changed chunks are summarized and embedded
+    return run_in_worker_loop(
+        _process_document(self, document_id, incremental=True, superseded_public_id=superseded_public_id)
+    )
+
+
+async def _process_document(
+    task,
+    document_id: str,
+    incremental: bool = False,
+    superseded_public_id: Optional[str] = None
+):
+
+    async with AsyncSessionLocal() as db:
         document = None
         try:
-            document = db.get(Document, document_id)
-            
+            document = await db.get(Document, document_id)
+
             if not document:
                 raise DocumentProcessingError(f"Document {document_id} not found")
-            
-            document.processing_status = ProcessingStatus.PROCESSING.value
-            db.commit()
-            db.refresh(document)
-            
-            # Parse PDF (separate event loop)
-            unstructured_service = UnstructuredService()
-            chunks_data = asyncio.run(unstructured_service.parse_pdf(document.cloudinary_url))
-            
-            # Summarize chunks (separate event loop)
+
+            document = await document_repo.update_status(
+                document_id, ProcessingStatus.PROCESSING, None, db
+            )
+
+            if settings.ingestion_distributed:
+                return await _fan_out_document(task, document, incremental, superseded_public_id, db)
+
+            # Streaming parse -> summarize -> embed -> (vector upsert || chunk rows)
+            persist_stats = {'rows': 0, 'elapsed_seconds': 0.0}
+
+            async def save_chunks(results):
+                # Set-based insert per batch, commit once the whole document succeeded
+                batch_stats = await _save_chunk_results(document_id, results, db)
+                persist_stats['rows'] += batch_stats['rows']
+                persist_stats['elapsed_seconds'] += batch_stats['elapsed_seconds']
+
+            vector_store = await get_worker_vector_store()
+            namespace = vector_namespace(document.user_id)
             gemini_service = GeminiService()
-            summarised_chunks = asyncio.run(gemini_service.summarize_chunks(chunks=chunks_data))
-            
-            # Prepare embeddings (sync)
-            embedding_vectors = [
-                {
-                    "embedding_id": chunk['embed_data']['embedding_id'],
-                    "embedding": chunk['embed_data']['embedding']
-                }
-                for chunk in summarised_chunks
-            ]
-            
-            # ALL Pinecone operations in ONE event loop
-            async def handle_pinecone():
-                """Execute all Pinecone operations in single async context"""
-                pinecone_service = PineconeService()
-                try:
-                    await pinecone_service.connect()
-                    result = await pinecone_service.upsert_embeddings(embedding_vectors)
-                    return result
-                finally:
-                    await pinecone_service.disconnect()
-            
-            # Run all Pinecone operations together
-            pinecone_result = asyncio.run(handle_pinecone())
-            logger.info(f"Upserted {pinecone_result['upserted_count']} embeddings to Pinecone")
-            
-            # Save chunks to DB (sync)
-            chunks = []
-            for data in summarised_chunks:
-                chunk = DocumentChunk(
-                    document_id=document_id,
-                    embedding_id=data['embed_data']['embedding_id'],
-                    content=data['metadata'],
-                    summary=data['summary']
+
+            chunk_filter = None
+            previous_by_hash: Dict[str, List[DocumentChunk]] = {}
+            if incremental:
+                previous_by_hash = await _load_previous_chunks(document_id, db)
+                # Unchanged chunks keep their vectors, so they must be where the new ones go
+                await _move_legacy_vectors(vector_store, document_id, namespace, _previous_vector_ids(previous_by_hash))
+                chunk_filter = functools.partial(_is_changed_chunk, previous_by_hash)
+
+            # A retry resumes from what the previous attempt parsed, embedded and upserted
+            checkpoint = IngestionCheckpointService(document_id, document.content_hash)
+            unstructured_service = UnstructuredService()
+            pipeline = IngestionPipeline(
+                unstructured_service=unstructured_service,
+                gemini_service=gemini_service,
+                upsert_vectors=functools.partial(vector_store.upsert_embeddings, namespace=namespace),
+                persist_chunks=save_chunks,
+                chunk_filter=chunk_filter,
+                progress=lambda snapshot: progress_service.publish(document_id, snapshot),
+                checkpoint=checkpoint,
+                document_id=document_id
+            )
+            stats = await pipeline.run(document.cloudinary_url, document.content_hash)
+
+            # Whatever was not matched no longer exists in the new version
+            removed_chunks = [chunk for matches in previous_by_hash.values() for chunk in matches]
+            if removed_chunks:
+                await chunk_repo.delete_by_ids([chunk.id for chunk in removed_chunks], db)
+
+            await db.commit()
+            await checkpoint.clear()
+
+            removed_vector_ids = [chunk.embedding_id for chunk in removed_chunks if chunk.embedding_id]
+            if removed_vector_ids:
+                await vector_store.delete_vectors(removed_vector_ids, namespace=namespace)
+
+            logger.info(
+                f"Upserted {stats['vectors_upserted']} embeddings to the vector store and "
+                f"saved {stats['chunks_persisted']} chunks in {stats['elapsed_seconds']}s"
+            )
+            if persist_stats['elapsed_seconds'] > 0:
+                logger.info(
+                    f"Chunk inserts: {persist_stats['rows']} rows in {persist_stats['elapsed_seconds']:.3f}s "
+                    f"({persist_stats['rows'] / persist_stats['elapsed_seconds']:.1f} rows/s)"
+                )
+            if stats['chunks_resumed']:
+                logger.info(f"Resumed {stats['chunks_resumed']} chunks from an earlier attempt")
+            if incremental:
+                logger.info(
+                    f"Incremental update of document {document_id}: {stats['chunks_skipped']} chunks unchanged, "
+                    f"{stats['chunks_persisted']} new or changed, {len(removed_chunks)} removed"
                 )
-                chunks.append(chunk)
-            
-            db.add_all(chunks)
-            db.commit()
-            
-            logger.info(f"Successfully saved {len(chunks)} chunks")
-            
+            logger.info(f"Chunk cache stats: {await gemini_service.chunk_cache.get_stats()}")
+
             # Update document status
-            document.processing_status = ProcessingStatus.COMPLETED.value
-            db.commit()
-            
-        except (SQLAlchemyError, VectorStoreError, DocumentProcessingError) as exc:
+            await document_repo.update_status(
+                document_id, ProcessingStatus.COMPLETED, None, db
+            )
+            await progress_service.finish(document_id, 'completed')
+            unstructured_service.release_spooled_pdf(document.content_hash)
+            await _delete_superseded_file(superseded_public_id, db)
+
+        except (SQLAlchemyError, DatabaseError, VectorStoreError, DocumentProcessingError) as exc:
             if document:
-                db.rollback()
-                document.processing_status = ProcessingStatus.FAILED.value
-                document.error_message = str(exc)
-                db.commit()
+                await db.rollback()
+                await document_repo.update_status(
+                    document_id, ProcessingStatus.FAILED, str(exc), db
+                )
+                await progress_service.finish(document_id, 'failed')
             logger.error(f"Processing failed for document {document_id}: {str(exc)}")
-            raise self.retry(exc=exc)
-        
+            raise task.retry(exc=exc, countdown=_retry_countdown(task))
+
         except Exception as exc:
             if document:
-                db.rollback()
-                document.processing_status = ProcessingStatus.FAILED.value
-                document.error_message = str(exc)
-                db.commit()
+                await db.rollback()
+                await document_repo.update_status(
+                    document_id, ProcessingStatus.FAILED, str(exc), db
+                )
+                await progress_service.finish(document_id, 'failed')
             logger.error(f"Unexpected failure for document {document_id}: {str(exc)}")
-            raise
\ No newline at end of file
+            raise
+
+
+async def _delete_superseded_file(public_id: Optional[str], db) -> None:
+    """Delete the previous version's PDF once the new one is processed, unless a duplicate upload shares it"""
+    if not public_id or await document_repo.is_cloudinary_asset_used(public_id, db):
+        return
+    try:
+        await CloudinaryService().delete_file(public_id)
+        logger.info(f"Deleted superseded file {public_id}")
+    except Exception as e:
+        # The document is done - an orphaned file is not worth failing it over
+        logger.warning(f"Failed to delete superseded file {public_id}: {str(e)}")
+
+
+def _retry_countdown(task) -> int:
+    """Exponential backoff with jitter: base, 2x base, 4x base... capped at `ingestion_retry_backoff_max`"""
+    countdown = settings.ingestion_retry_backoff_seconds * (2 ** task.request.retries)
+    countdown = min(countdown, settings.ingestion_retry_backoff_max)
+    return int(countdown * random.uniform(0.8, 1.2))
+
+
+async def _load_previous_chunks(document_id: str, db) -> Dict[str, List[DocumentChunk]]:
+    """Chunks of the previous version keyed by content hash, to be matched against the new PDF"""
+    previous_by_hash: Dict[str, List[DocumentChunk]] = {}
+    for previous_chunk in await chunk_repo.get_by_document_id(document_id, db, include_content=True):
+        content_hash = previous_chunk.content_hash or stored_chunk_content_hash(previous_chunk.content)
+        previous_by_hash.setdefault(content_hash, []).append(previous_chunk)
+    return previous_by_hash
+
+
+def _claim_previous_chunk(previous_by_hash: Dict[str, List[DocumentChunk]], content_hash: str) -> bool:
+    """Match a parsed chunk to an unchanged previous chunk. Whatever is never claimed was removed."""
+    matches = previous_by_hash.get(content_hash)
+    if matches:
+        matches.pop()
+        return True
+    return False
+
+
+def _is_changed_chunk(previous_by_hash: Dict[str, List[DocumentChunk]], chunk_idx: int, content: Any) -> bool:
+    """Keep unchanged chunks as they are; only changed ones go through the pipeline"""
+    return not _claim_previous_chunk(previous_by_hash, chunk_content_hash(content))
+
+
+def _previous_vector_ids(previous_by_hash: Dict[str, List[DocumentChunk]]) -> List[str]:
+    return [chunk.embedding_id for matches in previous_by_hash.values() for chunk in matches if chunk.embedding_id]
+
+
+async def _move_legacy_vectors(
+    vector_store: VectorStore,
+    document_id: str,
+    namespace: Optional[str],
+    embedding_ids: List[str]
+) -> int:
+    """
+    Move a document's vectors written before namespaces (default namespace, no metadata) into its
+    owner's namespace, tagged with document_id. Vectors already moved are no longer found there,
+    so this is safe to repeat. Returns the number of vectors moved.
+    """
+    if not embedding_ids or stores_embeddings_with_chunks():
+        return 0
+
+    legacy_vectors = await vector_store.fetch_vectors(embedding_ids)
+    if not legacy_vectors:
+        return 0
+
+    metadata = document_vector_metadata(document_id)
+    await vector_store.upsert_embeddings(
+        [
+            {"embedding_id": embedding_id, "embedding": embedding, "metadata": metadata}
+            for embedding_id, embedding in legacy_vectors.items()
+        ],
+        namespace=namespace
+    )
+    if namespace is not None:
+        await vector_store.delete_vectors(list(legacy_vectors))
+    return len(legacy_vectors)
+
+
+async def _save_chunk_results(document_id: str, results: List[Dict[str, Any]], db) -> Dict[str, Any]:
+    """Insert chunk rows for summarized results without committing"""
+    # Images and large tables live in the blob store, rows keep references
+    blob_store = get_blob_store()
+    contents = await asyncio.gather(*[
+        blob_store.externalize_chunk_content(data['metadata']) for data in results
+    ])
+    embeddings = None
+    if stores_embeddings_with_chunks():
+        embeddings = {data['embed_data']['embedding_id']: data['embed_data']['embedding'] for data in results}
+    return await chunk_repo.insert_bulk([
+        {
+            'document_id': document_id,
+            'embedding_id': data['embed_data']['embedding_id'],
+            'content': content,
+            'summary': data['summary'],
+            'content_hash': data['content_hash']
+        }
+        for data, content in zip(results, contents)
+    ], db, embeddings=embeddings)
+
+
+async def _fan_out_document(
+    task,
+    document: Document,
+    incremental: bool,
+    superseded_public_id: Optional[str],
+    db
+) -> Dict[str, Any]:
+    """
+    Distributed mode: parse here, then summarize/embed/upsert/persist chunk batches spread across the
+    worker fleet, on the document's scheduler lane, in chords of `ingestion_max_inflight_batches`
+    sent one after another (see `_send_batch_window`). Batches carry chunk indices;
+    the extracted content waits in the ingestion checkpoint. `finalize_document` marks the document
+    completed and, like `fail_document`, hands back this task's scheduler slot.
+    """
+    document_id = document.id
+    namespace = vector_namespace(document.user_id)
+    queue = ingestion_scheduler.queues[ingestion_scheduler.lane_for(document.file_size)]
+    previous_by_hash = await _load_previous_chunks(document_id, db) if incremental else {}
+    previous_chunk_ids = [chunk.id for matches in previous_by_hash.values() for chunk in matches]
+    if previous_by_hash:
+        vector_store = await get_worker_vector_store()
+        await _move_legacy_vectors(vector_store, document_id, namespace, _previous_vector_ids(previous_by_hash))
+
+    gemini_service = GeminiService()
+    unstructured_service = UnstructuredService()
+    checkpoint = IngestionCheckpointService(document_id, document.content_hash)
+    await checkpoint.reset_parse()
+    batch_size = settings.ingestion_fanout_batch_size
+    start_time = time.monotonic()
+
+    pages = {'parsed': 0, 'total': 0}
+
+    def on_pages(pages_parsed: int, pages_total: int):
+        pages.update(parsed=pages_parsed, total=pages_total)
+
+    batches, batch, parsed = [], [], []
+    chunks_parsed = chunks_skipped = 0
+    async for chunk in unstructured_service.stream_chunks(document.cloudinary_url, document.content_hash, on_pages):
+        # Parsed elements don't serialize - batches read the extracted content back by chunk index
+        content = gemini_service.extract_content(chunk)
+        parsed.append(content)
+        if _claim_previous_chunk(previous_by_hash, chunk_content_hash(content)):
+            chunks_skipped += 1
+        else:
+            batch.append(chunks_parsed)
+            if len(batch) >= batch_size:
+                batches.append(batch)
+                batch = []
+        chunks_parsed += 1
+
+        if len(parsed) >= batch_size:
+            await checkpoint.save_parsed_batch(parsed)
+            parsed = []
+    if batch:
+        batches.append(batch)
+    await checkpoint.save_parsed_batch(parsed)
+    await checkpoint.complete_parse(pages['total'])
+
+    removed_chunks = [chunk for matches in previous_by_hash.values() for chunk in matches]
+    slot_task_id = task.request.id
+    finalizer = finalize_document_task.s(
+        document_id,
+        [chunk.id for chunk in removed_chunks],
+        [chunk.embedding_id for chunk in removed_chunks if chunk.embedding_id],
+        namespace,
+        slot_task_id,
+        superseded_public_id
+    )
+    errback = fail_document_task.s(document_id, previous_chunk_ids, namespace, slot_task_id).set(queue=queue)
+    finalizer = finalizer.set(queue=queue).on_error(errback)
+
+    await progress_service.publish(document_id, {
+        'state': 'running',
+        'stage': 'summarize',
+        'pages_total': pages['total'],
+        'pages_parsed': pages['parsed'],
+        'chunks_parsed': chunks_parsed,
+        'chunks_skipped': chunks_skipped,
+        'chunks_persisted': 0,
+        'batches_total': len(batches),
+        'elapsed_seconds': round(time.monotonic() - start_time, 2),
+    })
+
+    # Publishing to the broker is blocking I/O
+    if batches:
+        await asyncio.to_thread(
+            _send_batch_window, document_id, document.content_hash, batches, namespace, queue, finalizer, errback, []
+        )
+    else:
+        await asyncio.to_thread(finalizer.apply_async, ([],))
+
+    # The slot now belongs to the chord - finalize/fail release it, not this task's postrun
+    _handed_off_slots.add(slot_task_id)
+
+    logger.info(
+        f"Fanned out document {document_id}: {chunks_parsed} chunks parsed, {chunks_skipped} unchanged, "
+        f"{len(batches)} batches of up to {batch_size} on queue {queue}"
+    )
+    return {'chunks_parsed': chunks_parsed, 'chunks_skipped': chunks_skipped, 'batches': len(batches)}
+
+
+def _send_batch_window(
+    document_id: str,
+    content_hash: Optional[str],
+    batches: List[List[int]],
+    namespace: Optional[str],
+    queue: str,
+    finalizer,
+    errback,
+    previous_results: List[Dict[str, Any]]
+) -> None:
+    """
+    Send the next `ingestion_max_inflight_batches` chunk batches of a document as a chord. Its callback
+    sends the window after, so a large document never floods the lane's queue ahead of other users.
+    """
+    window_size = settings.ingestion_max_inflight_batches
+    window, remaining = batches[:window_size], batches[window_size:]
+    header = group(
+        process_chunk_batch_task.s(document_id, content_hash, batch, namespace).set(queue=queue)
+        for batch in window
+    )
+    body = continue_fan_out_task.s(
+        document_id, content_hash, remaining, namespace, queue, finalizer, errback, previous_results
+    ).set(queue=queue).on_error(errback)
+    chord(header)(body)
+
+
+@celery_app.task(name='continue_fan_out')
+def continue_fan_out_task(
+    batch_results: List[Dict[str, Any]],
+    document_id: str,
+    content_hash: Optional[str],
+    remaining_batches: List[List[int]],
+    namespace: Optional[str],
+    queue: str,
+    finalizer: Dict[str, Any],
+    errback: Dict[str, Any],
+    previous_results: List[Dict[str, Any]]
+):
+    # Chord callback of one window of chunk batches: send the next window, or finalize the document
+    results = [*previous_results, *batch_results]
+    if remaining_batches:
+        _send_batch_window(
+            document_id, content_hash, remaining_batches, namespace, queue,
+            signature(finalizer), signature(errback), results
+        )
+    else:
+        signature(finalizer).apply_async((results,))
+
+
+@celery_app.task(bind=True, name='process_chunk_batch')
+def process_chunk_batch_task(
+    self,
+    document_id: str,
+    content_hash: Optional[str],
+    chunk_indices: List[int],
+    namespace: Optional[str] = None
+):
+    # One slice of a fanned-out document, by chunk index into the parsed checkpoint
+    return run_in_worker_loop(_process_chunk_batch(self, document_id, content_hash, chunk_indices, namespace))
+
+
+async def _process_chunk_batch(
+    task,
+    document_id: str,
+    content_hash: Optional[str],
+    chunk_indices: List[int],
+    namespace: Optional[str]
+) -> Dict[str, Any]:
+
+    async with AsyncSessionLocal() as db:
+        try:
+            checkpoint = IngestionCheckpointService(document_id, content_hash)
+            contents = await checkpoint.parsed_contents_at(chunk_indices)
+            if any(content is None for content in contents):
+                raise DocumentProcessingError(f"Parsed content of document {document_id} is missing")
+
+            gemini_service = GeminiService()
+            semaphore = asyncio.Semaphore(gemini_service.max_concurrency)
+
+            async def summarize(chunk_idx: int, content: Dict[str, Any]):
+                async with semaphore:
+                    return await gemini_service.summarize_content(content, chunk_idx, document_id)
+
+            results = await asyncio.gather(*[
+                summarize(chunk_idx, content) for chunk_idx, content in zip(chunk_indices, contents)
+            ])
+            results = await gemini_service.embed_results(results)
+
+            vectors = [
+                {
+                    "embedding_id": result['embed_data']['embedding_id'],
+                    "embedding": result['embed_data']['embedding'],
+                    "metadata": document_vector_metadata(document_id)
+                }
+                for result in results
+                if result['embed_data']['embedding']
+            ]
+            vectors_upserted = 0
+            if vectors:
+                vector_store = await get_worker_vector_store()
+                vectors_upserted = (await vector_store.upsert_embeddings(vectors, namespace=namespace))['upserted_count']
+
+            insert_stats = await _save_chunk_results(document_id, results, db)
+            await db.commit()
+            chunk_cache_hits = sum(1 for result in results if result['cached'])
+            chunk_cache_misses = (
+                len(results) - chunk_cache_hits if gemini_service.settings.chunk_cache_enabled else 0
+            )
+            await progress_service.record_batch(
+                document_id, insert_stats['rows'], chunk_cache_hits, chunk_cache_misses
+            )
+
+            return {
+                'chunks_persisted': insert_stats['rows'],
+                'vectors_upserted': vectors_upserted,
+                'chunk_cache_hits': chunk_cache_hits,
+                'chunk_cache_misses': chunk_cache_misses
+            }
+
+        except (SQLAlchemyError, DatabaseError, VectorStoreError, DocumentProcessingError) as exc:
+            await db.rollback()
+            logger.error(f"Chunk batch of document {document_id} failed: {str(exc)}")
+            raise task.retry(exc=exc, countdown=_retry_countdown(task))
+
+
+@celery_app.task(bind=True, name='finalize_document')
+def finalize_document_task(
+    self,
+    batch_results: List[Dict[str, Any]],
+    document_id: str,
+    removed_chunk_ids: List[str],
+    removed_vector_ids: List[str],
+    namespace: Optional[str] = None,
+    slot_task_id: Optional[str] = None,
+    superseded_public_id: Optional[str] = None
+):
+    # Chord callback: runs once every chunk batch of the document has been persisted
+    return run_in_worker_loop(_finalize_document(
+        self, batch_results, document_id, removed_chunk_ids, removed_vector_ids,
+        namespace, slot_task_id, superseded_public_id
+    ))
+
+
+async def _finalize_document(
+    task,
+    batch_results: List[Dict[str, Any]],
+    document_id: str,
+    removed_chunk_ids: List[str],
+    removed_vector_ids: List[str],
+    namespace: Optional[str],
+    slot_task_id: Optional[str],
+    superseded_public_id: Optional[str]
+):
+
+    async with AsyncSessionLocal() as db:
+        try:
+            if removed_chunk_ids:
+                await chunk_repo.delete_by_ids(removed_chunk_ids, db)
+                await db.commit()
+            if removed_vector_ids:
+                vector_store = await get_worker_vector_store()
+                await vector_store.delete_vectors(removed_vector_ids, namespace=namespace)
+
+            document = await document_repo.update_status(
+                document_id, ProcessingStatus.COMPLETED, None, db
+            )
+            await progress_service.finish(document_id, 'completed')
+            await IngestionCheckpointService(document_id, document.content_hash).clear()
+            UnstructuredService().release_spooled_pdf(document.content_hash)
+            await _delete_superseded_file(superseded_public_id, db)
+
+            totals = {
+                key: sum(result[key] for result in batch_results)
+                for key in ('chunks_persisted', 'vectors_upserted', 'chunk_cache_hits', 'chunk_cache_misses')
+            }
+            logger.info(
+                f"Document {document_id} completed from {len(batch_results)} batches: {totals}, "
+                f"{len(removed_chunk_ids)} chunks removed"
+            )
+
+        except (SQLAlchemyError, DatabaseError, VectorStoreError) as exc:
+            await db.rollback()
+            logger.error(f"Finalizing document {document_id} failed: {str(exc)}")
+            raise task.retry(exc=exc, countdown=_retry_countdown(task))
+
+    if slot_task_id:
+        await ingestion_scheduler.release(slot_task_id)
+
+
+@celery_app.task(name='fail_document')
+def fail_document_task(
+    request,
+    exc,
+    traceback,
+    document_id: str,
+    previous_chunk_ids: List[str],
+    namespace: Optional[str] = None,
+    slot_task_id: Optional[str] = None
+):
+    # Chord error callback: a chunk batch (or the finalizer) of the document failed for good
+    return run_in_worker_loop(_fail_document(document_id, str(exc), previous_chunk_ids, namespace, slot_task_id))
+
+
+async def _fail_document(
+    document_id: str,
+    error_message: str,
+    previous_chunk_ids: List[str],
+    namespace: Optional[str],
+    slot_task_id: Optional[str]
+):
+
+    async with AsyncSessionLocal() as db:
+        try:
+            # Roll back what the successful batches wrote: rows that did not exist before this run.
+            # A fresh document ends up empty, a new version keeps its previous chunks.
+            kept = set(previous_chunk_ids)
+            chunks = [chunk for chunk in await chunk_repo.get_by_document_id(document_id, db) if chunk.id not in kept]
+            if chunks:
+                await chunk_repo.delete_by_ids([chunk.id for chunk in chunks], db)
+                await db.commit()
+                vector_ids = [chunk.embedding_id for chunk in chunks if chunk.embedding_id]
+                if vector_ids:
+                    vector_store = await get_worker_vector_store()
+                    await vector_store.delete_vectors(vector_ids, namespace=namespace)
+
+            document = await document_repo.update_status(
+                document_id, ProcessingStatus.FAILED, error_message, db
+            )
+            await progress_service.finish(document_id, 'failed')
+            await IngestionCheckpointService(document_id, document.content_hash).clear()
+            logger.error(
+                f"Distributed processing failed for document {document_id}, "
+                f"{len(chunks)} chunks rolled back: {error_message}"
+            )
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to mark document {document_id} as failed: {str(e)}")
+
+    if slot_task_id:
+        await ingestion_scheduler.release(slot_task_id)
+
+
+@celery_app.task(bind=True, name='clone_document')
+def clone_document_task(self, document_id: str, source_document_id: str):
+    # Duplicate upload: copy chunks and vectors of an already processed document, no LLM calls
+    return run_in_worker_loop(_clone_document(document_id, source_document_id))
+
+
+async def _clone_document(document_id: str, source_document_id: str):
+
+    async with AsyncSessionLocal() as db:
+        try:
+            source = await document_repo.get_by_id_or_raise(source_document_id, db)
+            source_chunks = await chunk_repo.get_by_document_id(source_document_id, db, include_content=True)
+
+            if not source_chunks:
+                raise DocumentProcessingError(f"Source document {source_document_id} has no chunks")
+
+            vector_store = await get_worker_vector_store()
+            document = await document_repo.get_by_id_or_raise(document_id, db)
+            namespace = vector_namespace(document.user_id)
+            metadata = document_vector_metadata(document_id)
+
+            source_ids = [chunk.embedding_id for chunk in source_chunks if chunk.embedding_id]
+            source_vectors = await vector_store.fetch_vectors(source_ids, namespace=vector_namespace(source.user_id))
+            missing_ids = [embedding_id for embedding_id in source_ids if embedding_id not in source_vectors]
+            if missing_ids and settings.vector_store_legacy_fallback:
+                # Source processed before namespaces and not migrated yet
+                source_vectors.update(await vector_store.fetch_vectors(missing_ids))
+
+            rows, vectors = [], []
+            for chunk_idx, source_chunk in enumerate(source_chunks):
+                embedding = source_vectors.get(source_chunk.embedding_id)
+                content_hash = source_chunk.content_hash or stored_chunk_content_hash(source_chunk.content)
+                embedding_id = chunk_vector_id(document_id, chunk_idx, content_hash) if embedding else None
+                if embedding:
+                    vectors.append({"embedding_id": embedding_id, "embedding": embedding, "metadata": metadata})
+
+                rows.append({
+                    'document_id': document_id,
+                    'embedding_id': embedding_id,
+                    'content': source_chunk.content,
+                    'summary': source_chunk.summary,
+                    'content_hash': source_chunk.content_hash
+                })
+
+            if vectors:
+                await vector_store.upsert_embeddings(vectors, namespace=namespace)
+
+            embeddings = None
+            if stores_embeddings_with_chunks():
+                embeddings = {vector['embedding_id']: vector['embedding'] for vector in vectors}
+            insert_stats = await chunk_repo.insert_bulk(rows, db, embeddings=embeddings)
+
+            document.insights = source.insights
+            document.insights_available = source.insights_available
+            await db.commit()
+
+            await document_repo.update_status(
+                document_id, ProcessingStatus.COMPLETED, None, db
+            )
+            logger.info(
+                f"Cloned {insert_stats['rows']} chunks ({insert_stats['rows_per_second']} rows/s) and "
+                f"{len(vectors)} vectors from document {source_document_id} into {document_id}"
+            )
+
+        except Exception as exc:
+            # Cloning is only a shortcut - fall back to the full pipeline
+            await db.rollback()
+            logger.error(
+                f"Cloning document {source_document_id} into {document_id} failed, "
+                f"processing from scratch: {str(exc)}"
+            )
+            document = await document_repo.get_by_id_or_raise(document_id, db)
+            await ingestion_scheduler.submit(
+                'process_document', [document_id], document.user_id, document.file_size
+            )
+
+
+@celery_app.task(name='migrate_vector_namespaces')
+def migrate_vector_namespaces_task(batch_size: int = 100):
+    # One-off backfill after enabling namespaces: `celery -A app.celery_app call migrate_vector_namespaces`
+    return run_in_worker_loop(_migrate_vector_namespaces(batch_size))
+
+
+async def _migrate_vector_namespaces(batch_size: int) -> Dict[str, int]:
+    """Move every document's legacy vectors into its owner's namespace, a page of documents at a time"""
+    vector_store = await get_worker_vector_store()
+    documents = vectors_moved = 0
+    after_id = None
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            owners = await document_repo.get_document_owners(after_id, batch_size, db)
+            if not owners:
+                break
+
+            for document_id, user_id in owners:
+                chunks = await chunk_repo.get_by_document_id(document_id, db)
+                vectors_moved += await _move_legacy_vectors(
+                    vector_store,
+                    document_id,
+                    vector_namespace(user_id),
+                    [chunk.embedding_id for chunk in chunks if chunk.embedding_id]
+                )
+                documents += 1
+
+            after_id = owners[-1][0]
+            # Chunks of finished pages are not needed again
+            db.expunge_all()
+            logger.info(f"Vector namespace migration: {documents} documents checked, {vectors_moved} vectors moved")
+
+    return {'documents': documents, 'vectors_moved': vectors_moved}
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Any, Coroutine, Optional
+from celery.signals import worker_process_init, worker_process_shutdown
+from app.core.config import get_settings
+from app.core.database import engine
+from app.core.redis_client import redis_client
+from app.services.vector_store import VectorStore, create_vector_store
+from app.services.unstructured_service import shutdown_process_pool, close_http_session
+
+logger = logging.getLogger(__name__)
+
+# One long-lived event loop per worker process, shared by every task it runs
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Worker-scoped vector store client, connected once and reused by every document
+_vector_store: Optional[VectorStore] = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Return the worker's event loop, creating it if the init signal never fired (e.g. solo pool)"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion on the worker's persistent loop"""
+    return get_worker_loop().run_until_complete(coro)
+
+
+async def get_worker_vector_store() -> VectorStore:
+    """Return the worker's vector store (backend per `vector_store_backend`), (re)connecting it if needed"""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = create_vector_store()
+    await _vector_store.ensure_connected()
+    return _vector_store
+
+
+@worker_process_init.connect
+def init_worker_loop(**kwargs):
+    # Connections inherited from the parent process must not be reused after fork
+    engine.sync_engine.dispose(close=False)
+    get_worker_loop()
+    logger.info("Worker event loop initialized")
+
+    try:
+        run_in_worker_loop(redis_client.connect(get_settings().redis_url))
+        logger.info("Worker Redis client connected")
+    except Exception as e:
+        # Not fatal - Redis-backed features (chunk cache) degrade to misses
+        logger.error(f"Failed to connect worker Redis client: {str(e)}")
+
+    try:
+        run_in_worker_loop(get_worker_vector_store())
+        logger.info("Worker vector store connected")
+    except Exception as e:
+        # Not fatal - the first task retries the connection
+        logger.error(f"Failed to connect worker vector store: {str(e)}")
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_loop(**kwargs):
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+
+    try:
+        if _vector_store is not None:
+            _worker_loop.run_until_complete(_vector_store.disconnect())
+        _worker_loop.run_until_complete(close_http_session())
+        _worker_loop.run_until_complete(redis_client.disconnect())
+        _worker_loop.run_until_complete(engine.dispose())
+        _worker_loop.run_until_complete(_worker_loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.error(f"Error shutting down worker event loop: {str(e)}")
+    finally:
+        shutdown_process_pool()
+        _worker_loop.close()
+        _worker_loop = None
+        logger.info("Worker event loop closed")
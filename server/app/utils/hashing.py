@@ -0,0 +1,29 @@
+import hashlib
+import uuid
+from typing import Any, Dict
+
+# Namespace of chunk vector IDs - changing it would re-key every vector in the index
+CHUNK_VECTOR_ID_NAMESPACE = uuid.UUID('6f1c2b9e-4d3a-5e8f-9a7b-0c1d2e3f4a5b')
+
+
+def chunk_content_hash(content: Dict[str, Any]) -> str:
+    """SHA-256 of a chunk's extracted text, tables and images (as returned by GeminiService.extract_content)"""
+    digest = hashlib.sha256()
+    for part in [content['text'], *content['tables'], *content['images']]:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def stored_chunk_content_hash(chunk_content: Dict[str, Any]) -> str:
+    """Same hash computed from a DocumentChunk.content row"""
+    return chunk_content_hash({
+        'text': chunk_content.get('raw_text', ''),
+        'tables': chunk_content.get('tables_html', []),
+        'images': chunk_content.get('image_base64', []),
+    })
+
+
+def chunk_vector_id(document_id: str, chunk_index: int, content_hash: str) -> str:
+    """Stable vector ID of a document chunk, so reprocessing overwrites vectors instead of orphaning them"""
+    return str(uuid.uuid5(CHUNK_VECTOR_ID_NAMESPACE, f"{document_id}:{chunk_index}:{content_hash}"))